@@ -1,23 +1,193 @@
-# Builds a time-line which gathers zero or more time-lines 
-# having all values sorted in the time ascending order
+import heapq
+
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
+
+# Builds a time-line which gathers zero or more time-lines
+# having all values sorted in the time descending order
 class Add:
-    
-    def __init__(self):
+
+    def __init__(self, sorted=False):
         self.result = []
-    
+        self.sorted = sorted
+
     def process(self, secondTimeLine):
+        if self.sorted:
+            # Both time-lines are already sorted, a linear merge is enough
+            self.result = list(Add.lazy_merge([self.result, secondTimeLine]))
+            return self.result
         self.result.extend(secondTimeLine)
         self.result.sort(key=lambda value: value['time'], reverse=True)
         return self.result
 
-class SubtractProcessor:
+    # Lazily merges time-sorted time-lines (each in either order) with a heap,
+    # yielding events in the time descending order
+    @staticmethod
+    def lazy_merge(timeLines):
+        descending = []
+        for timeLine in timeLines:
+            if 1 < len(timeLine) and timeLine[0]['time'] < timeLine[-1]['time']:
+                descending.append(reversed(timeLine))
+            else:
+                descending.append(iter(timeLine))
+        return heapq.merge(*descending, key=lambda value: value['time'], reverse=True)
+
+    # Merges all time-sorted time-lines at once in O(total * log(count))
+    @staticmethod
+    def merge(timeLines):
+        timeLines = list(timeLines)
+        if timeLines and all(isinstance(timeLine, TimeLine) for timeLine in timeLines):
+            times = np.concatenate([timeLine.times for timeLine in timeLines])
+            values = np.concatenate([timeLine.values for timeLine in timeLines])
+            # The stable sort detects the already sorted runs
+            order = np.argsort(-times, kind='stable')
+            return TimeLine(times[order], values[order], descending=True)
+        return list(Add.lazy_merge(timeLines))
+
+
+# Aligns two or more time-lines on their time-stamps:
+#   "inner" - time-stamps present in all time-lines;
+#   "outer" - time-stamps present in any time-line, missing numbers are NaN and
+#            other missing values are None;
+#   "asof" - time-stamps of the first time-line, the others take their latest value
+#            not later than that, optionally not older than the tolerance;
+#   "interpolate" - time-stamps of all time-lines within their common range,
+#            the values are linearly interpolated.
+# Returns columnar time-lines sharing one ascending time column. The "inner" and "outer"
+# modes join a time-stamp once: a time-line repeating it gives the value of its first
+# event with that time-stamp in the ascending order.
+class Join:
+
+    def __init__(self, how='inner', tolerance=None):
+        if how not in ('inner', 'outer', 'asof', 'interpolate'):
+            raise ValueError("Unknown join mode: " + str(how))
+        self.how = how
+        self.tolerance = tolerance
+
+    def process(self, timeLines):
+        timeLines = [TimeLine.of(timeLine).ascending() for timeLine in timeLines]
+        if 0 == len(timeLines):
+            return []
+        if self.how == 'inner':
+            times, columns = Join.__inner(timeLines)
+        elif self.how == 'outer':
+            times, columns = Join.__outer(timeLines)
+        elif self.how == 'asof':
+            times, columns = self.__asof(timeLines)
+        else:
+            times, columns = Join.__interpolate(timeLines)
+        return [TimeLine(times, column, ascending=True) for column in columns]
+
+    @staticmethod
+    def __inner(timeLines):
+        times = timeLines[0].times
+        for timeLine in timeLines[1:]:
+            times = np.intersect1d(times, timeLine.times)
+        columns = [timeLine.values[np.searchsorted(timeLine.times, times)] for timeLine in timeLines]
+        return times, columns
+
+    @staticmethod
+    def __outer(timeLines):
+        times = timeLines[0].times
+        for timeLine in timeLines[1:]:
+            times = np.union1d(times, timeLine.times)
+        columns = []
+        for timeLine in timeLines:
+            if timeLine.values.dtype.kind in 'biuf':
+                column = np.full(len(times), np.nan)
+            else:
+                column = np.full(len(times), None, dtype=object)
+            if 0 < len(timeLine):
+                indexes = np.minimum(np.searchsorted(timeLine.times, times), len(timeLine) - 1)
+                found = timeLine.times[indexes] == times
+                column[found] = timeLine.values[indexes[found]]
+            columns.append(column)
+        return times, columns
+
+    def __asof(self, timeLines):
+        times = timeLines[0].times
+        valid = np.ones(len(times), dtype=bool)
+        columns = [timeLines[0].values]
+        for timeLine in timeLines[1:]:
+            if 0 == len(timeLine):
+                valid[:] = False
+                columns.append(np.full(len(times), np.nan))
+                continue
+            indexes = np.searchsorted(timeLine.times, times, 'right') - 1
+            valid &= 0 <= indexes
+            indexes = np.maximum(indexes, 0)
+            if self.tolerance is not None:
+                valid &= times - timeLine.times[indexes] <= self.tolerance
+            columns.append(timeLine.values[indexes])
+        return times[valid], [column[valid] for column in columns]
+
+    @staticmethod
+    def __interpolate(timeLines):
+        if any(0 == len(timeLine) for timeLine in timeLines):
+            return np.empty(0, dtype=np.int64), [np.empty(0) for _ in timeLines]
+        start = max(timeLine.times[0] for timeLine in timeLines)
+        end = min(timeLine.times[-1] for timeLine in timeLines)
+        times = np.unique(np.concatenate([timeLine.times for timeLine in timeLines]))
+        times = times[(start <= times) & (times <= end)]
+        columns = [np.interp(times, timeLine.times, timeLine.values.astype(np.float64)) for timeLine in timeLines]
+        return times, columns
+
+
+# Combines the values of time-aligned time-lines with a vectorized binary operation.
+# Columnar input gives a columnar result, lists of events give a list of events.
+# The result is in the time order of the first time-line (descending for Storage sources).
+class JoinProcessor:
+
+    def __init__(self, operation, how='inner', tolerance=None):
+        self.operation = operation
+        self.join = Join(how, tolerance)
+
     def process(self, data):
-        data1 = data[0]
-        data2 = data[1]
-        return [{'time': data1[i]['time'], 'value': data1[i]['value'] - data2[i]['value']}
-                for i in range(len(data1))]
+        aligned = self.join.process(data)
+        if 0 == len(aligned):
+            return []
+        values = aligned[0].values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for timeLine in aligned[1:]:
+                values = self.operation(values, timeLine.values)
+        result = TimeLine(aligned[0].times, values, ascending=True)
+        if JoinProcessor.__descending(data[0]):
+            result = result[::-1]
+        if all(isinstance(timeLine, TimeLine) for timeLine in data):
+            return result
+        return result.events()
+
+    @staticmethod
+    def __descending(timeLine):
+        if isinstance(timeLine, TimeLine):
+            return not timeLine.is_ascending() and timeLine.is_descending()
+        return 1 < len(timeLine) and timeLine[0]['time'] > timeLine[-1]['time']
+
+
+class AddProcessor(JoinProcessor):
+    def __init__(self, how='inner', tolerance=None):
+        super().__init__(np.add, how, tolerance)
+
+
+class SubtractProcessor(JoinProcessor):
+    def __init__(self, how='inner', tolerance=None):
+        super().__init__(np.subtract, how, tolerance)
+
+
+class MultiplyProcessor(JoinProcessor):
+    def __init__(self, how='inner', tolerance=None):
+        super().__init__(np.multiply, how, tolerance)
+
+
+class DivideProcessor(JoinProcessor):
+    def __init__(self, how='inner', tolerance=None):
+        super().__init__(np.true_divide, how, tolerance)
 
 
 class AbsoluteProcessor:
+    streamable = True
+
     def process(self, data):
         return [{'time': item['time'], 'value': abs(item['value'])} for item in data]
@@ -0,0 +1,272 @@
+import os
+import re
+import copy
+import types
+import datetime
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
+# Returned by caches for absent or expired keys
+MISSING = object()
+
+
+# A stable content hash of processor configurations, arguments and time-lines.
+# Objects are hashed by their "cache_key()" if they declare one (processors holding
+# sessions, pools or locks do), otherwise by their attributes. Values without a
+# stable content (no attributes, a default repr with a memory address) raise TypeError
+# rather than giving keys which differ between runs or collide.
+def fingerprint(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        _digest(digest, value, 0, set())
+    return digest.hexdigest()
+
+
+def _digest(digest, value, depth, path):
+    if isinstance(value, list) and 0 == depth:
+        # Time-lines of events are hashed through pickle, which is much faster than walking
+        # them; a different element order of sets inside only costs a cache miss
+        try:
+            digest.update(b'pickle')
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            return
+        except Exception:
+            pass
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        digest.update(type(value).__name__.encode())
+        digest.update(repr(value).encode())
+        return
+    if isinstance(value, (np.generic, datetime.date, datetime.time, datetime.timedelta)):
+        digest.update(type(value).__name__.encode())
+        digest.update(repr(value).encode())
+        return
+    if isinstance(value, type):
+        digest.update(b'type')
+        digest.update((value.__module__ + '.' + value.__qualname__).encode())
+        return
+    if isinstance(value, re.Pattern):
+        digest.update(b'pattern')
+        _digest(digest, (value.pattern, value.flags), depth + 1, path)
+        return
+
+    # Containers and objects may refer to themselves
+    if id(value) in path:
+        raise TypeError("Unable to fingerprint a cyclic structure of " + type(value).__qualname__)
+    path.add(id(value))
+    try:
+        _digestComposite(digest, value, depth, path)
+    finally:
+        path.discard(id(value))
+
+
+def _digestComposite(digest, value, depth, path):
+    if isinstance(value, TimeLine):
+        digest.update(b'TimeLine')
+        _digest(digest, value.times, depth + 1, path)
+        _digest(digest, value.values, depth + 1, path)
+    elif isinstance(value, np.ndarray):
+        digest.update(str(value.dtype).encode())
+        digest.update(str(value.shape).encode())
+        if value.dtype == object:
+            _digest(digest, value.tolist(), depth + 1, path)
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        digest.update(str(len(value)).encode())
+        for item in value:
+            _digest(digest, item, depth + 1, path)
+    elif isinstance(value, (set, frozenset)):
+        digest.update(b'set')
+        for item in sorted(fingerprint(item) for item in value):
+            digest.update(item.encode())
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        digest.update(str(len(value)).encode())
+        for key in sorted(value, key=fingerprint):
+            _digest(digest, key, depth + 1, path)
+            _digest(digest, value[key], depth + 1, path)
+    elif isinstance(value, types.FunctionType):
+        # Constants, globals used and closed over values tell apart functions of the same code
+        code = value.__code__
+        digest.update(b'function')
+        digest.update(value.__qualname__.encode())
+        digest.update(code.co_code)
+        _digest(digest, tuple(constant for constant in code.co_consts if not isinstance(constant, types.CodeType)),
+                depth + 1, path)
+        _digest(digest, code.co_names, depth + 1, path)
+        _digest(digest, value.__defaults__, depth + 1, path)
+        _digest(digest, tuple(cell.cell_contents for cell in value.__closure__ or ()), depth + 1, path)
+    elif isinstance(value, types.MethodType):
+        digest.update(b'method')
+        _digest(digest, value.__func__, depth + 1, path)
+        _digest(digest, value.__self__, depth + 1, path)
+    elif isinstance(value, (types.BuiltinFunctionType, np.ufunc)):
+        digest.update(b'builtin')
+        digest.update((str(getattr(value, '__module__', None)) + '.' + value.__name__).encode())
+    elif callable(getattr(value, 'cache_key', None)):
+        digest.update(type(value).__qualname__.encode())
+        _digest(digest, value.cache_key(), depth + 1, path)
+    elif hasattr(value, '__dict__'):
+        # Objects are identified by their class and their attributes
+        digest.update(type(value).__qualname__.encode())
+        _digest(digest, vars(value), depth + 1, path)
+    else:
+        raise TypeError("Unable to fingerprint a " + type(value).__qualname__ + ", declare its cache_key()")
+
+
+# An in-memory LRU cache with an optional time to live (in seconds)
+class MemoryCache:
+
+    def __init__(self, max_entries=128, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return MISSING
+            expires, value = self.entries[key]
+            if expires is not None and expires < time.time():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            expires = time.time() + self.ttl if self.ttl is not None else None
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while self.max_entries < len(self.entries):
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# An on-disk cache storing pickled values in a directory, with an optional time to live
+# (in seconds) and a total size limit enforced by evicting the least recently used files
+class DiskCache:
+
+    def __init__(self, directory, max_bytes=1 << 30, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.pickle')
+
+    def get(self, key):
+        path = self.__path(key)
+        with self.lock:
+            try:
+                with open(path, 'rb') as file:
+                    expires, value = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return MISSING
+            if expires is not None and expires < time.time():
+                os.remove(path)
+                return MISSING
+            # The modification time tracks the recent use
+            os.utime(path)
+            return value
+
+    def set(self, key, value):
+        path = self.__path(key)
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            temporary_path = path + '.tmp'
+            with open(temporary_path, 'wb') as file:
+                pickle.dump((expires, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+            self.__evict()
+
+    def clear(self):
+        with self.lock:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def __evict(self):
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.pickle'):
+                status = os.stat(os.path.join(self.directory, name))
+                files.append((status.st_mtime, status.st_size, name))
+                total += status.st_size
+        files.sort()
+        for modified, size, name in files:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+# Looks up caches in order (e.g. memory, then disk) and fills the faster ones on a hit
+class TieredCache:
+
+    def __init__(self, *caches):
+        self.caches = caches
+
+    def get(self, key):
+        for i in range(len(self.caches)):
+            value = self.caches[i].get(key)
+            if value is not MISSING:
+                for cache in self.caches[:i]:
+                    cache.set(key, value)
+                return value
+        return MISSING
+
+    def set(self, key, value):
+        for cache in self.caches:
+            cache.set(key, value)
+
+    def clear(self):
+        for cache in self.caches:
+            cache.clear()
+
+
+# Wraps a processor (typically a remote source) to reuse its results for the same
+# configuration and arguments. Results are copied unless "copy" is off, since
+# downstream filters may modify events in place.
+class Cached:
+
+    def __init__(self, processor, cache=None, copy=True):
+        self.processor = processor
+        self.cache = cache if cache is not None else MemoryCache()
+        self.copy = copy
+
+    def __str__(self):
+        return self.processor.__str__()
+
+    def process(self, *arguments):
+        key, value = self.lookup(*arguments)
+        if value is MISSING:
+            value = self.processor.process(*arguments)
+            self.store(key, value)
+        return value
+
+    # The cache key for the arguments and the cached result, or MISSING
+    def lookup(self, *arguments):
+        key = fingerprint(self.processor, *arguments)
+        value = self.cache.get(key)
+        if value is not MISSING and self.copy:
+            value = copy.deepcopy(value)
+        return key, value
+
+    def store(self, key, value):
+        self.cache.set(key, copy.deepcopy(value) if self.copy else value)
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+# A time-line stored as a contiguous int64 time column and a typed value column.
+# Slices are views over the same buffers, single items are read as the usual
+# {'time': ..., 'value': ...} events, so list-based processors can consume it as is.
+class TimeLine:
+
+    def __init__(self, times, values, ascending=None, descending=None):
+        self.times = np.asarray(times, dtype=np.int64)
+        self.values = TimeLine.column(values)
+        if self.times.ndim != 1 or len(self.times) != len(self.values):
+            raise ValueError("Time and value columns must be one-dimensional and of the same length")
+        self.__ascending = ascending
+        self.__descending = descending
+
+    # Builds a typed value column: int64, float64 or object
+    @staticmethod
+    def column(values):
+        if isinstance(values, np.ndarray):
+            return values
+        values = list(values)
+        types = set(type(value) for value in values)
+        if types and types <= {int}:
+            try:
+                return np.array(values, dtype=np.int64)
+            except OverflowError:
+                pass
+        elif types and types <= {int, float}:
+            return np.array(values, dtype=np.float64)
+        column = np.empty(len(values), dtype=object)
+        for i in range(len(values)):
+            column[i] = values[i]
+        return column
+
+    @staticmethod
+    def from_events(events):
+        if isinstance(events, TimeLine):
+            return events
+        times = np.fromiter((event['time'] for event in events), dtype=np.int64, count=len(events))
+        return TimeLine(times, [event['value'] for event in events])
+
+    # Accepts either a time-line object or a list of events
+    @staticmethod
+    def of(timeLine):
+        if isinstance(timeLine, TimeLine):
+            return timeLine
+        return TimeLine.from_events(timeLine if timeLine is not None else [])
+
+    def events(self):
+        return [{'time': time, 'value': value} for time, value in zip(self.times.tolist(), self.values.tolist())]
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        for i in range(len(self.times)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # Slices keep the known order, reversed ones swap it
+            if key.step is None or 0 < key.step:
+                return TimeLine(self.times[key], self.values[key], self.__ascending, self.__descending)
+            return TimeLine(self.times[key], self.values[key], self.__descending, self.__ascending)
+        if isinstance(key, np.ndarray) and key.dtype == bool:
+            # A mask keeps the order
+            return TimeLine(self.times[key], self.values[key], self.__ascending, self.__descending)
+        if isinstance(key, (np.ndarray, list)):
+            return TimeLine(self.times[key], self.values[key])
+        value = self.values[key]
+        return {
+            'time': int(self.times[key]),
+            'value': value.item() if isinstance(value, np.generic) else value
+        }
+
+    def __repr__(self):
+        return 'TimeLine(length={0}, dtype={1})'.format(len(self), self.values.dtype)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    # Whether time-stamps are in the ascending (descending) order, checked once and remembered
+    def is_ascending(self):
+        if self.__ascending is None:
+            self.__ascending = bool(np.all(self.times[:-1] <= self.times[1:]))
+        return self.__ascending
+
+    def is_descending(self):
+        if self.__descending is None:
+            self.__descending = bool(np.all(self.times[:-1] >= self.times[1:]))
+        return self.__descending
+
+    # Returns the time-line sorted by time-stamps (stable), or itself if already sorted
+    def ascending(self):
+        if self.is_ascending():
+            return self
+        order = np.argsort(self.times, kind='stable')
+        return TimeLine(self.times[order], self.values[order], ascending=True)
+
+    def copy(self):
+        return TimeLine(self.times.copy(), self.values.copy(), self.__ascending, self.__descending)
+
+    # Events with start <= time <= end (bounds are optional and may be exclusive).
+    # Sorted time-lines are answered by binary search with a view, others with a mask.
+    def window(self, start=None, end=None, start_inclusive=True, end_inclusive=True):
+        times = self.times
+        if self.is_ascending() or self.is_descending():
+            first, last = span(self, start, end, start_inclusive, end_inclusive)
+            return self[first:last]
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= start <= times if start_inclusive else start < times
+        if end is not None:
+            mask &= times <= end if end_inclusive else times < end
+        return self[mask]
+
+
+# Start and end indexes of the events within [start, end] of a time-sorted time-line,
+# either ascending or descending, a columnar one or a list of events
+def span(timeLine, start=None, end=None, start_inclusive=True, end_inclusive=True):
+
+    length = len(timeLine)
+    if 0 == length:
+        return 0, 0
+
+    if isinstance(timeLine, TimeLine):
+        times = timeLine.times
+        descending = times[0] > times[-1]
+        if descending:
+            times = times[::-1]
+        first = 0 if start is None else int(np.searchsorted(times, start, 'left' if start_inclusive else 'right'))
+        last = length if end is None else int(np.searchsorted(times, end, 'right' if end_inclusive else 'left'))
+        if descending:
+            first, last = length - last, length - first
+        return first, max(first, last)
+
+    descending = timeLine[0]['time'] > timeLine[-1]['time']
+    if descending:
+        # In the descending order the first events are the latest ones
+        first = 0 if end is None else _bisect(timeLine, lambda time: time <= end if end_inclusive else time < end)
+        last = length if start is None else _bisect(
+            timeLine, lambda time: time < start if start_inclusive else time <= start)
+    else:
+        first = 0 if start is None else _bisect(
+            timeLine, lambda time: start <= time if start_inclusive else start < time)
+        last = length if end is None else _bisect(timeLine, lambda time: end < time if end_inclusive else end <= time)
+    return first, max(first, last)
+
+
+# The first index where the monotonous condition on event time becomes true
+def _bisect(timeLine, condition):
+    low = 0
+    high = len(timeLine)
+    while low < high:
+        middle = (low + high) // 2
+        if condition(timeLine[middle]['time']):
+            high = middle
+        else:
+            low = middle + 1
+    return low
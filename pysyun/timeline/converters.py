@@ -1,22 +1,98 @@
-import time
+import re
+import calendar
+from datetime import datetime, timezone
 
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
+# A time zone offset ending a date and time, as "+03:00", "-0500" or "+03"
+_offset = re.compile(r'[T ]\d\d(?::?\d\d){0,2}(?:[.,]\d+)?[+-]\d\d(?::?\d\d)?$')
+
+# Converts JSON objects into events timed by their ISO-8601 date field in UTC milliseconds.
+# Dates are parsed all at once by numpy; the ones it does not accept (time zone offsets,
+# other layouts) are parsed one by one with datetime and then the given strptime "formats".
+# numpy only warns about offsets instead of applying them, so these are told apart first.
 class JSONArray:
     
-    def __init__(self, dateField, textField):
+    streamable = True
+
+    def __init__(self, dateField, textField, formats=None, columnar=False):
         self.dateField = dateField
         self.textField = textField
+        self.formats = formats if formats is not None else []
+        self.columnar = columnar
     
     def process(self, timeLine):
-        results = []
-        for i in range(len(timeLine)):
-            event = timeLine[i]
-            dateValue = event[self.dateField]
-            # TODO: There is an opinion that "ciso8601" library is much faster
-            dateValue = time.mktime(time.strptime(dateValue, '%Y-%m-%dT%H:%M:%S.%fZ'))
-            dateValue = int(dateValue) * 1000
-            value = event[self.textField] 
-            results.append ({
-                'time': dateValue,
-                'value': value
-            })            
-        return results
+        dates = [event[self.dateField] for event in timeLine]
+        values = [event[self.textField] for event in timeLine]
+        times = self.parse(dates)
+        if self.columnar:
+            return TimeLine(times, TimeLine.column(values))
+        return [{'time': time, 'value': value} for time, value in zip(times.tolist(), values)]
+
+    def parse(self, dates):
+        zoned = np.array([JSONArray.__zoned(date) for date in dates], dtype=bool)
+        plain = np.flatnonzero(~zoned)
+        try:
+            # "Z" means UTC anyway
+            parsed = np.array([JSONArray.__utc(dates[i]) for i in plain.tolist()], dtype='datetime64[ms]')
+        except ValueError:
+            return np.array([self.__parse(date) for date in dates], dtype=np.int64)
+        # numpy reads empty and "NaT" dates as not-a-time
+        missing = np.flatnonzero(np.isnat(parsed))
+        if 0 < len(missing):
+            raise ValueError("Invalid date: " + repr(dates[plain[missing[0]]]))
+        times = np.empty(len(dates), dtype=np.int64)
+        times[plain] = parsed.astype(np.int64)
+        times[zoned] = [self.__parse(dates[i]) for i in np.flatnonzero(zoned).tolist()]
+        return times
+
+    def __parse(self, date):
+        if not JSONArray.__zoned(date):
+            try:
+                time = np.datetime64(JSONArray.__utc(date), 'ms')
+                if not np.isnat(time):
+                    return int(time.astype(np.int64))
+            except ValueError:
+                pass
+        try:
+            moment = datetime.fromisoformat(date.replace('Z', '+00:00'))
+        except ValueError:
+            moment = None
+        for dateFormat in self.formats:
+            if moment is not None:
+                break
+            try:
+                moment = datetime.strptime(date, dateFormat)
+            except ValueError:
+                pass
+        if moment is None:
+            raise ValueError("Unknown date format: " + date)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc)
+        return calendar.timegm(moment.timetuple()) * 1000 + moment.microsecond // 1000
+
+    @staticmethod
+    def __zoned(date):
+        return isinstance(date, str) and _offset.search(date) is not None
+
+    @staticmethod
+    def __utc(date):
+        return date[:-1] if date.endswith('Z') else date
+
+
+# Converts a list of events into a columnar time-line
+class Columnar:
+
+    def process(self, timeLine):
+        return TimeLine.of(timeLine)
+
+
+# Converts a columnar time-line back into a list of events
+class Events:
+
+    def process(self, timeLine):
+        if isinstance(timeLine, TimeLine):
+            return timeLine.events()
+        return timeLine
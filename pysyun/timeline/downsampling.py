@@ -0,0 +1,107 @@
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
+
+# The base for downsamplers selecting representative event indexes of a time-line.
+# The time-line is sorted by time first; columnar input gives a columnar result.
+class Downsampler:
+
+    def process(self, timeLine):
+        columnar = isinstance(timeLine, TimeLine)
+        timeLine = TimeLine.of(timeLine).ascending()
+        result = timeLine[self.indexes(timeLine.times, timeLine.values)]
+        return result if columnar else result.events()
+
+    def indexes(self, times, values):
+        raise NotImplementedError()
+
+
+# Largest-Triangle-Three-Buckets: keeps "threshold" points, choosing in each bucket
+# the one forming the largest triangle with the previous choice and the next bucket average
+class LargestTriangleThreeBuckets(Downsampler):
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def indexes(self, times, values):
+        length = len(times)
+        if self.threshold >= length or self.threshold < 3:
+            return np.arange(length)
+
+        x = np.asarray(times, dtype=np.float64)
+        y = np.asarray(values, dtype=np.float64)
+
+        # The first and the last points are always kept, the rest is split into buckets
+        edges = np.linspace(1, length - 1, self.threshold - 1).astype(np.int64)
+        result = np.empty(self.threshold, dtype=np.int64)
+        result[0] = 0
+        result[-1] = length - 1
+
+        selected = 0
+        for i in range(self.threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            if i + 2 < len(edges):
+                nextX = x[end:edges[i + 2]].mean()
+                nextY = y[end:edges[i + 2]].mean()
+            else:
+                nextX, nextY = x[-1], y[-1]
+            areas = np.abs((x[selected] - nextX) * (y[start:end] - y[selected]) -
+                           (x[selected] - x[start:end]) * (nextY - y[selected]))
+            selected = start + int(np.argmax(areas))
+            result[i + 1] = selected
+        return result
+
+
+# Splits the time range into "bucketCount" equal buckets and keeps chosen points
+# of every non-empty bucket in their original order
+class TimeBuckets(Downsampler):
+
+    def __init__(self, bucketCount):
+        self.bucketCount = bucketCount
+
+    def indexes(self, times, values):
+        length = len(times)
+        if length <= 4 * self.bucketCount:
+            return np.arange(length)
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        width = (times[-1] - times[0]) / self.bucketCount
+        if 0 == width:
+            buckets = np.zeros(length, dtype=np.int64)
+        else:
+            buckets = np.minimum(((times - times[0]) / width).astype(np.int64), self.bucketCount - 1)
+        firsts = np.flatnonzero(np.diff(buckets, prepend=-1))
+        lasts = np.append(firsts[1:], length) - 1
+        counts = lasts - firsts + 1
+
+        # Index of the first extreme value in every bucket; NaN values are skipped,
+        # and a bucket of NaN values only is represented by its first event
+        positions = np.arange(length)
+        minimums = np.repeat(np.fmin.reduceat(values, firsts), counts)
+        maximums = np.repeat(np.fmax.reduceat(values, firsts), counts)
+        minimums = np.minimum.reduceat(np.where(values == minimums, positions, length), firsts)
+        maximums = np.minimum.reduceat(np.where(values == maximums, positions, length), firsts)
+        minimums = np.where(minimums <= lasts, minimums, firsts)
+        maximums = np.where(maximums <= lasts, maximums, firsts)
+
+        return np.unique(np.concatenate(self.select(firsts, lasts, minimums, maximums)))
+
+    def select(self, firsts, lasts, minimums, maximums):
+        raise NotImplementedError()
+
+
+# Keeps the minimum and the maximum of every bucket
+class MinMaxBuckets(TimeBuckets):
+
+    def select(self, firsts, lasts, minimums, maximums):
+        return [minimums, maximums]
+
+
+# M4: keeps the first, the last, the minimum and the maximum of every bucket,
+# which renders a line chart identical to the raw one with "bucketCount" pixel columns
+class M4(TimeBuckets):
+
+    def select(self, firsts, lasts, minimums, maximums):
+        return [firsts, lasts, minimums, maximums]
@@ -4,6 +4,8 @@ import json
 import math
 import time
 import requests
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 
@@ -12,22 +14,33 @@ from pandas import DataFrame
 from scipy.spatial.distance import pdist
 from scipy.cluster.hierarchy import *
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn import preprocessing
 
+from pysyun.timeline.cache import MISSING, MemoryCache, fingerprint
+from pysyun.timeline.columnar import TimeLine, span
+from pysyun.timeline.indexes import TokenIndex
+from pysyun.timeline.ingestion import parser
+from pysyun.timeline.statistics import BinnedAggregate
+from pysyun.timeline.transport import RequestExecutor
 
-# Removes all exact matches from a time-line according to the black list
+
+# Removes all exact matches from a time-line according to the black list.
+# A token index is queried instead of scanned.
 class BlackList:
 
+    streamable = True
+
     def __init__(self, expressions):
         self.expressions = expressions
 
     def process(self, timeLine):
+        if isinstance(timeLine, TokenIndex):
+            return timeLine.exclude(self.expressions)
         results = []
         for j in range(len(timeLine)):
             segment = timeLine[j]['value']
-            for k in range(len(self.expressions)):
-                segment.discard(self.expressions[k])
+            segment.difference_update(self.expressions)
             if len(segment) != 0:
                 results.append({
                     'time': timeLine[j]['time'],
@@ -36,23 +49,31 @@ class BlackList:
         return results
 
 
+# Keeps the values (or the tokens of value lists) found in the white list.
+# A token index is queried instead of scanned.
 class WhiteList:
 
+    streamable = True
+
     def __init__(self, values):
         self.values = values
+        self.lookup = set(values)
 
     def process(self, timeLine):
+        if isinstance(timeLine, TokenIndex):
+            return timeLine.select(self.lookup)
+        values = self.lookup
         results = []
         for i in range(len(timeLine)):
             segment = timeLine[i]['value']
             if isinstance(segment, int) or isinstance(segment, str):
-                if segment in self.values:
+                if segment in values:
                     results.append({
                         'time': timeLine[i]['time'],
                         'value': segment
                     })
             else:
-                segment = filter(lambda x: x in self.values, segment)
+                segment = filter(lambda x: x in values, segment)
                 segment = list(segment)
                 if len(segment) != 0:
                     results.append({
@@ -64,19 +85,93 @@ class WhiteList:
     # Takes all regular expression matches from a time-line according to the regular expressions white list
 
 
+# Keeps the segments of events matching any of the expressions from their start.
+# Literal expressions are checked as string prefixes and the others are combined into
+# one precompiled alternation; each segment is matched once per call, whatever the
+# number of expressions. Large time-lines may be split among "processes" workers.
 class RegularExpressionWhiteList:
 
-    def __init__(self, expressions):
+    streamable = True
+    dependent = re.compile(r'\(\?[aiLmsux]|\(\?P[<=]|\\[1-9]')
+
+    def __init__(self, expressions, processes=None, chunk_size=100000):
         self.expressions = expressions
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+        prefixes = []
+        patterns = []
+        for expression in expressions:
+            literal = RegularExpressionWhiteList.literal(expression)
+            if literal is not None:
+                prefixes.append(literal)
+            else:
+                patterns.append(expression)
+        self.prefixes = tuple(prefixes)
+        self.patterns = RegularExpressionWhiteList.compile(patterns)
 
     def process(self, timeLine):
+        if self.processes is None or len(timeLine) <= self.chunk_size:
+            return self.filter(timeLine)
+        chunks = [timeLine[i:i + self.chunk_size] for i in range(0, len(timeLine), self.chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            for result in executor.map(self.filter, chunks):
+                results.extend(result)
+        return results
+
+    def matches(self, segment):
+        if self.prefixes and segment.startswith(self.prefixes):
+            return True
+        for pattern in self.patterns:
+            if pattern.match(segment) is not None:
+                return True
+        return False
+
+    # One alternation of all the expressions, or each compiled apart where joining them
+    # changes their meaning: global inline flags, numbered backreferences, named groups
+    @staticmethod
+    def compile(patterns):
+        if not patterns:
+            return ()
+        if not any(RegularExpressionWhiteList.dependent.search(pattern) for pattern in patterns):
+            try:
+                return (re.compile('|'.join('(?:' + pattern + ')' for pattern in patterns)),)
+            except re.error:
+                pass
+        return tuple(re.compile(pattern) for pattern in patterns)
+
+    # The string matched by an expression free of special characters, otherwise None
+    @staticmethod
+    def literal(expression):
+        characters = []
+        escaped = False
+        for character in expression:
+            if escaped:
+                if character.isalnum():
+                    return None
+                characters.append(character)
+                escaped = False
+            elif '\\' == character:
+                escaped = True
+            elif character in '.^$*+?{}[]|()':
+                return None
+            else:
+                characters.append(character)
+        return None if escaped else ''.join(characters)
+
+    def filter(self, timeLine):
+        # Tokens repeat a lot in text corpora
+        known = {}
         results = []
         for i in range(len(timeLine)):
             segments = []
             for segment in timeLine[i]['value']:
-                for expression in self.expressions:
-                    if None != re.match(expression, segment):
-                        segments.append(segment)
+                matched = known.get(segment)
+                if matched is None:
+                    matched = known[segment] = self.matches(segment)
+                if matched:
+                    segments.append(segment)
             if len(segments):
                 results.append({
                     'time': timeLine[i]['time'],
@@ -159,13 +254,23 @@ class TelegramInvitationMetadata:
         return channels
 
 
+# Takes events within [start, end]. Columnar time-lines and time-lines known
+# to be sorted (in either order) are restricted with a binary search.
 class DateRange:
 
-    def __init__(self, start, end):
+    streamable = True
+
+    def __init__(self, start, end, sorted=False):
         self.start = start
         self.end = end
+        self.sorted = sorted
 
     def process(self, timeLine):
+        if isinstance(timeLine, TimeLine):
+            return timeLine.window(self.start, self.end)
+        if self.sorted:
+            first, last = span(timeLine, self.start, self.end)
+            return timeLine[first:last]
         newTimeLine = []
         for i in range(len(timeLine)):
             value = timeLine[i]
@@ -176,11 +281,19 @@ class DateRange:
 
 class InverseDateRange:
 
-    def __init__(self, start, end):
+    streamable = True
+
+    def __init__(self, start, end, sorted=False):
         self.start = start
         self.end = end
+        self.sorted = sorted
 
     def process(self, timeLine):
+        if isinstance(timeLine, TimeLine):
+            return timeLine.window(end=min(self.start, self.end), end_inclusive=False)
+        if self.sorted:
+            first, last = span(timeLine, end=min(self.start, self.end), end_inclusive=False)
+            return timeLine[first:last]
         newTimeLine = []
         for i in range(len(timeLine)):
             value = timeLine[i]
@@ -229,13 +342,141 @@ class ValueChanges:
         return results
 
 
+# Segments a time-line into clusters of close time-stamps. The "linkage" method runs
+# K-means over a hierarchical clustering (O(n^2) memory). The scalable methods are:
+#   "gaps" - cuts the sorted time-stamps at the largest gaps;
+#   "optimal" - optimal 1-D K-means by dynamic programming over up to "resolution"
+#               weighted groups of time-stamps (exact for fewer distinct time-stamps);
+#   "minibatch" - mini-batch K-means.
+# Without a cluster count, scalable methods run the elbow method once on a sample of
+# "sampleSize" time-stamps, and reuse the result while later calls draw the same sample.
 class KMeansClustering:
 
-    def __init__(self, clusterCount=None):
+    def __init__(self, clusterCount=None, method='linkage', sampleSize=10000, resolution=1000):
+        if method not in ('linkage', 'gaps', 'optimal', 'minibatch'):
+            raise ValueError("Unknown clustering method: " + str(method))
         self.clusterCount = clusterCount
+        self.method = method
+        self.sampleSize = sampleSize
+        self.resolution = resolution
+        self.__elbow = None
+
+    # The remembered elbow does not change the result
+    def cache_key(self):
+        return self.clusterCount, self.method, self.sampleSize, self.resolution
 
     def process(self, timeLine):
 
+        if 'linkage' == self.method:
+            return self.__linkage(timeLine)
+
+        columnar = isinstance(timeLine, TimeLine)
+        times = TimeLine.of(timeLine).times
+        if 0 == len(times):
+            return TimeLine([], []) if columnar else []
+
+        clusterCount = self.clusterCount
+        if clusterCount is None:
+            sample = times
+            if self.sampleSize < len(times):
+                sample = np.random.default_rng(1).choice(times, self.sampleSize, replace=False)
+            sample = np.sort(sample)
+            key = fingerprint(sample, self.resolution)
+            if self.__elbow is not None and key == self.__elbow[0]:
+                clusterCount = self.__elbow[1]
+            else:
+                costs = KMeansClustering.__optimal(sample, 19, self.resolution)[0]
+                clusterCount = KMeansClustering.elbow(costs, 1)
+                self.__elbow = (key, clusterCount)
+        clusterCount = min(clusterCount, len(times))
+
+        if clusterCount <= 1:
+            labels = np.zeros(len(times), dtype=np.int64)
+        elif 'gaps' == self.method:
+            ordered = np.sort(times)
+            gaps = np.argpartition(np.diff(ordered), len(ordered) - clusterCount)[len(ordered) - clusterCount:]
+            thresholds = np.sort(ordered[gaps + 1])
+            labels = np.searchsorted(thresholds, times, 'right')
+        elif 'optimal' == self.method:
+            thresholds = KMeansClustering.__optimal(np.sort(times), clusterCount, self.resolution)[1]
+            labels = np.searchsorted(thresholds, times, 'right')
+        else:
+            scaled = preprocessing.StandardScaler().fit_transform(times.reshape(-1, 1).astype(np.float64))
+            labels = MiniBatchKMeans(n_clusters=clusterCount, random_state=1, n_init=3).fit(scaled).labels_
+
+        # Re-index cluster identifiers to make them sequential
+        clusters = np.cumsum(np.concatenate(([1], labels[1:] != labels[:-1])))
+        result = TimeLine(times, clusters)
+        return result if columnar else result.events()
+
+    # The cluster count at the "elbow" of inertias for the counts starting from "start":
+    # the point farthest from the line between the first and the last inertias
+    @staticmethod
+    def elbow(samples, start):
+        x1, y1 = start, samples[0]
+        x2, y2 = start + len(samples) - 1, samples[len(samples) - 1]
+        distances = []
+        for i in range(len(samples)):
+            x0 = i + start
+            y0 = samples[i]
+            numerator = abs((y2 - y1) * x0 - (x2 - x1) * y0 + x2 * y1 - y2 * x1)
+            denominator = math.sqrt((y2 - y1) ** 2 + (x2 - x1) ** 2)
+            distances.append(numerator / denominator if 0 != denominator else 0)
+        return distances.index(max(distances)) + start
+
+    # Optimal 1-D K-means of sorted time-stamps for 1..clusterCount clusters. Returns the
+    # inertias for each count and the time-stamps starting clusters 2..clusterCount.
+    @staticmethod
+    def __optimal(ordered, clusterCount, resolution):
+
+        # Distinct time-stamps, or equally populated groups of them, with their weights
+        values, weights = np.unique(ordered, return_counts=True)
+        if resolution < len(values):
+            edges = np.linspace(0, len(ordered), resolution + 1).astype(np.int64)
+            edges = np.unique(edges)
+            weights = np.diff(edges)
+            values = np.add.reduceat(ordered.astype(np.float64), edges[:-1]) / weights
+            starts = ordered[edges[:-1]]
+        else:
+            starts = values
+        # Scaled to avoid the precision loss of squared epoch milliseconds
+        span = max(float(values[-1] - values[0]), 1.0)
+        x = (values - values[0]) / span
+        w = weights.astype(np.float64)
+        W = np.concatenate(([0], np.cumsum(w)))
+        S = np.concatenate(([0], np.cumsum(w * x)))
+        Q = np.concatenate(([0], np.cumsum(w * x * x)))
+        length = len(x)
+        clusterCount = min(clusterCount, length)
+
+        # The sum of squared deviations of groups j..i-1 for all j < i
+        j = np.arange(length + 1).reshape(-1, 1)
+        i = np.arange(length + 1).reshape(1, -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cost = (Q[i] - Q[j]) - (S[i] - S[j]) ** 2 / (W[i] - W[j])
+        cost[j >= i] = np.inf
+
+        inertias = []
+        splits = []
+        previous = cost[0]
+        inertias.append(previous[length] * span ** 2)
+        for k in range(2, clusterCount + 1):
+            candidates = previous.reshape(-1, 1) + cost
+            split = np.argmin(candidates, axis=0)
+            previous = candidates[split, np.arange(length + 1)]
+            splits.append(split)
+            inertias.append(previous[length] * span ** 2)
+
+        # Backtrack cluster starts
+        thresholds = []
+        end = length
+        for split in reversed(splits):
+            end = split[end]
+            thresholds.append(starts[end])
+        return inertias, np.array(sorted(thresholds))
+
+    def __linkage(self, timeLine):
+
         # Convert to the data frame
         data = {'time': []}
         for i in range(len(timeLine)):
@@ -268,19 +509,8 @@ class KMeansClustering:
                 kmSamples.fit(dataLinkage)
                 samples.append(kmSamples.inertia_)
 
-            x1, y1 = start, samples[0]
-            x2, y2 = (before - 1), samples[len(samples) - 1]
-
             # Find the optimum cluster count
-            distances = []
-            for i in range(len(samples)):
-                x0 = i + start
-                y0 = samples[i]
-                numerator = abs((y2 - y1) * x0 - (x2 - x1) * y0 + x2 * y1 - y2 * x1)
-                denominator = math.sqrt((y2 - y1) ** 2 + (x2 - x1) ** 2)
-                distances.append(numerator / denominator)
-
-            self.clusterCount = distances.index(max(distances)) + start
+            self.clusterCount = KMeansClustering.elbow(samples, start)
 
         # Perform K-means clustering
         km = KMeans(n_clusters=self.clusterCount, n_init=10, random_state=1).fit(dataNorm)
@@ -311,53 +541,59 @@ class KMeansClustering:
         return results
 
 
+# Aggregates time-line values over the runs of equal cluster identifiers produced by
+# KMeansClustering (sum by default, or count, mean, min, max, median, quantiles).
+# Each run is reported at the middle of its time span; with "bounds" set or several
+# aggregations, values are dictionaries also holding the run start and end times.
 class ClusterCentroid:
 
-    def process(self, timeLine, timeLineClusters):
+    def __init__(self, aggregations='sum', bounds=False):
+        self.aggregations = [aggregations] if isinstance(aggregations, str) else list(aggregations)
+        self.bounds = bounds
 
-        # Extracting time-line values
-        data = {'value': []}
-        for i in range(len(timeLine)):
-            data['value'].append(timeLine[i]['value'])
-
-            # Look for cluster groups count from timeLineClusters
-        # Find interval start and end indexes for each group
-        clusters = []
-        timeLineLength = len(timeLineClusters)
-        for index in range(timeLineLength):
-            cluster = timeLineClusters[index]['value']
-            if index != 0:
-                previouscluster = timeLineClusters[index - 1]['value']
-                if cluster != previouscluster:
-                    if len(clusters) == 0:
-                        interval = [0, index]
-                        clusters.append(interval)
-                    else:
-                        interval = [(clusters[-1][-1]) + 1, index]
-                        clusters.append(interval)
-                elif index == (timeLineLength - 1):
-                    interval = [(clusters[-1][-1]) + 1, timeLineLength - 1]
-                    clusters.append(interval)
-
-        # A new list containing cluster groups united by similarity for a given time span.
-        # Cluster groups contain sums of values of the cluster time span.
-        result = []
-        for i in range(len(clusters)):
-            first = clusters[i][0]
-            last = clusters[i][1]
-            timeLineCenter = int((timeLineClusters[first]['time'] + timeLineClusters[last]['time']) / 2)
-            total = sum(data['value'][first:last + 1])
-            result.append({
-                'time': timeLineCenter,
-                'value': total
-            })
+    def process(self, timeLine, timeLineClusters):
 
-        return result
+        columnar = isinstance(timeLine, TimeLine)
+        values = TimeLine.of(timeLine).values
+        timeLineClusters = TimeLine.of(timeLineClusters)
+        if len(values) != len(timeLineClusters):
+            raise ValueError("The time-line and its clusters must be of the same length")
+        if 0 == len(values):
+            return TimeLine([], []) if columnar else []
+
+        # Run-length encoding of cluster identifiers
+        clusters = timeLineClusters.values
+        times = timeLineClusters.times
+        firsts = np.flatnonzero(np.concatenate(([True], clusters[1:] != clusters[:-1])))
+        lasts = np.append(firsts[1:], len(clusters)) - 1
+        counts = lasts - firsts + 1
+        runs = np.repeat(np.arange(len(firsts)), counts)
+        centers = (times[firsts] + times[lasts]) // 2
+
+        columns = {}
+        for name in self.aggregations:
+            columns[name] = BinnedAggregate.aggregate(name, values, runs, firsts, counts)
+
+        if 1 == len(self.aggregations) and not self.bounds:
+            result = TimeLine(centers, columns[self.aggregations[0]])
+        else:
+            columns['start'] = times[firsts]
+            columns['end'] = times[lasts]
+            names = self.aggregations + ['start', 'end']
+            rows = zip(*[columns[name].tolist() for name in names])
+            result = TimeLine(centers, [dict(zip(names, row)) for row in rows])
+        return result if columnar else result.events()
 
 
 class Lowercase:
 
+    streamable = True
+
     def process(self, timeLine):
+        # Events of columnar time-lines are read as new dictionaries, so they are edited as a list
+        columnar = isinstance(timeLine, TimeLine)
+        if columnar:
+            timeLine = timeLine.events()
         for j in range(len(timeLine)):
             segment = timeLine[j]['value']
             if isinstance(segment, int) or isinstance(segment, str):
@@ -366,15 +602,20 @@ class Lowercase:
                 for k in range(len(segment)):
                     segment[k] = segment[k].lower()
             timeLine[j]['value'] = segment
-        return timeLine
+        return TimeLine.of(timeLine) if columnar else timeLine
 
 
 class CharacterBlackList:
 
+    streamable = True
+
     def __init__(self, substrings):
         self.substrings = substrings
 
     def process(self, timeLine):
+        columnar = isinstance(timeLine, TimeLine)
+        if columnar:
+            timeLine = timeLine.events()
         for j in range(len(timeLine)):
             segment = timeLine[j]['value']
             if isinstance(segment, int) or isinstance(segment, str):
@@ -386,11 +627,13 @@ class CharacterBlackList:
                     for k in range(len(self.substrings)):
                         segment[i] = segment[i].strip(self.substrings[k])
             timeLine[j]['value'] = segment
-        return timeLine
+        return TimeLine.of(timeLine) if columnar else timeLine
 
 
 class LambdaProjection:
 
+    streamable = True
+
     def __init__(self, projection):
         self.projection = projection
 
@@ -405,18 +648,26 @@ class LambdaProjection:
         return result
 
 
+# Decodes JSON values, with orjson if "fast" is set and it is installed (see ingestion.parser)
 class JSON:
 
+    streamable = True
+
+    def __init__(self, fast=False):
+        self.fast = fast
+
     def process(self, timeLine):
+        loads = parser(self.fast)
         result = []
         for i in range(len(timeLine)):
             event = timeLine[i]
-            event["value"] = json.loads(event["value"])
+            event["value"] = loads(event["value"])
             result.append(event)
 
         return result
 
 
+# Slicing a columnar time-line returns a view, so no events are copied
 class Limit:
     def __init__(self, start, end):
         self.start = start
@@ -437,7 +688,14 @@ class Empty():
 
 
 class LastTimeFrame:
+    streamable = True
+
     def process(self, timeLine):
+        if isinstance(timeLine, TimeLine):
+            return timeLine.window(self.start)
+        if self.sorted:
+            first, last = span(timeLine, self.start)
+            return timeLine[first:last]
         newTimeLine = []
         for i in range(len(timeLine)):
             value = timeLine[i]
@@ -445,7 +703,8 @@ class LastTimeFrame:
                 newTimeLine.append(value)
         return newTimeLine
 
-    def startTime(self, delta):
+    def startTime(self, delta, sorted=False):
+        self.sorted = sorted
         currentDate = datetime.today()
         currentDate = datetime(currentDate.year, currentDate.month, currentDate.day)
         currentDate = currentDate - delta
@@ -453,35 +712,41 @@ class LastTimeFrame:
 
 
 class LastMinutes(LastTimeFrame):
-    def __init__(self, count):
-        self.startTime(timedelta(minutes=count))
+    def __init__(self, count, sorted=False):
+        self.startTime(timedelta(minutes=count), sorted)
 
 
 class LastHours(LastTimeFrame):
-    def __init__(self, count):
-        self.startTime(timedelta(hours=count))
+    def __init__(self, count, sorted=False):
+        self.startTime(timedelta(hours=count), sorted)
 
 
 class LastDays(LastTimeFrame):
-    def __init__(self, count):
-        self.startTime(timedelta(days=count))
+    def __init__(self, count, sorted=False):
+        self.startTime(timedelta(days=count), sorted)
 
 
 class LastWeeks(LastTimeFrame):
-    def __init__(self, count):
-        self.startTime(timedelta(weeks=count))
+    def __init__(self, count, sorted=False):
+        self.startTime(timedelta(weeks=count), sorted)
 
 
 class LastMonths(LastTimeFrame):
-    def __init__(self, count):
-        self.startTime(timedelta(months=count))
+    def __init__(self, count, sorted=False):
+        self.startTime(timedelta(months=count), sorted)
 
 
 class CopyAIAugmentation:
 
-    def __init__(self, uri, augmented_culture):
+    streamable = True
+
+    def __init__(self, uri, augmented_culture, workers=8):
         self.uri = uri
         self.augmented_culture = augmented_culture
+        self.executor = RequestExecutor(workers)
+
+    def cache_key(self):
+        return self.uri, self.augmented_culture
 
     @staticmethod
     def headers():
@@ -514,10 +779,9 @@ class CopyAIAugmentation:
 
     def process(self, time_line):
         results = []
+        calls = []
         for event in time_line:
-            event_time = event["time"]
-            event_value = event["value"]
-            text = event_value["text"]
+            text = event["value"]["text"]
             data = {
                 "name": text,
                 "description": text,
@@ -525,7 +789,14 @@ class CopyAIAugmentation:
                 "input_language": self.augmented_culture,
                 "output_language": self.augmented_culture
             }
-            response = requests.post(self.uri, headers=CopyAIAugmentation.headers(), data=json.dumps(data))
+            calls.append(('POST', self.uri, {
+                'headers': CopyAIAugmentation.headers(),
+                'data': json.dumps(data)
+            }))
+        responses = self.executor.map(calls)
+        for event, response in zip(time_line, responses):
+            event_time = event["time"]
+            event_value = event["value"]
             if response.status_code == 200:
                 atoms = json.loads(response.text)
                 augmented_text = CopyAIAugmentation.__build_augmented_text(atoms)
@@ -542,24 +813,60 @@ class CopyAIAugmentation:
         return results
 
 
+# Text generation pipelines take long to load, so they are shared per model within a process
+_generators = {}
+_generatorsLock = threading.Lock()
+
+# Sentences generated for prompts, kept out of processor configurations (and their fingerprints)
+_generated = MemoryCache(max_entries=10000)
+
+
+def _generator(model):
+    with _generatorsLock:
+        if model not in _generators:
+            from transformers import pipeline
+            generator = pipeline('text-generation', model=model)
+            # GPT-2 has no padding token; batched prompts are padded on the left with the end of text
+            if generator.tokenizer.pad_token_id is None:
+                generator.tokenizer.pad_token_id = generator.model.config.eos_token_id
+            generator.tokenizer.padding_side = 'left'
+            _generators[model] = generator
+        return _generators[model]
+
+
+# Generates "sentences" continuations of every prompt in batches of "batch_size".
+# The number of CPU threads can be limited with "threads". With "reuse" set,
+# repeated prompts get the sentences generated once for them.
 class GPT2Transformer:
 
-    def __init__(self, length, sentences):
+    def __init__(self, length, sentences, model='gpt2', batch_size=8, threads=None, reuse=False):
         self.length = length
         self.sentences = sentences
+        self.model = model
+        self.batch_size = batch_size
+        self.threads = threads
+        self.reuse = reuse
 
     def process(self, data):
 
-        from transformers import pipeline
-        generator = pipeline('text-generation', model='gpt2')
-
-        results = []
-        for item in data:
-
-            sentences = []
-
-            response = generator(
-                item,
+        if self.threads is not None:
+            import torch
+            torch.set_num_threads(self.threads)
+
+        prompts = list(data)
+        known = {}
+        if self.reuse:
+            for prompt in dict.fromkeys(prompts):
+                known[prompt] = _generated.get(self.__key(prompt))
+            pending = [prompt for prompt in known if known[prompt] is MISSING]
+        else:
+            pending = prompts
+
+        responses = []
+        if 0 < len(pending):
+            responses = _generator(self.model)(
+                pending,
+                batch_size=self.batch_size,
                 do_sample=True,
                 top_k=50,
                 temperature=0.6,
@@ -567,12 +874,22 @@ class GPT2Transformer:
                 num_return_sequences=self.sentences
             )
 
+        results = []
+        for response in responses:
+            sentences = []
             for sentence in response:
                 sentence = sentence["generated_text"]
                 last_fullstop = sentence.rfind(".")
                 sentence = sentence[:last_fullstop + 1]
                 sentences.append(sentence)
-
             results.append(sentences)
 
-        return results
+        if not self.reuse:
+            return results
+        for prompt, sentences in zip(pending, results):
+            known[prompt] = sentences
+            _generated.set(self.__key(prompt), sentences)
+        return [list(known[prompt]) for prompt in prompts]
+
+    def __key(self, prompt):
+        return self.model, self.length, self.sentences, prompt
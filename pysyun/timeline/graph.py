@@ -2,31 +2,34 @@ from compute.graph.structure import Node
 
 from pysyun.timeline.renderers import InteractiveTimeLineChart
 from pysyun.timeline.filters import WhiteList
+from pysyun.timeline.indexes import TokenIndex
 from pysyun.timeline.statistics import EventCountAggregate
 
 class InteractiveTimeLineChartNode(Node):
 
-    __arguments = []
     __chart = None
     __projection = None
     
     def __init__(self, title, xTitle, yTitle):
         self.__chart = InteractiveTimeLineChart(title, xTitle, yTitle)
+        # Projections are looked up in the index instead of filtering all events on every change
+        self.__index = TokenIndex()
         super().__init__()
         
+    # The events are kept by the index only
     def read(self):
-        return self.__arguments
+        return self.__index.events
         
     def write(self, data):
         if [] == data:
-            self.__arguments = []
+            self.__index.clear()
         elif None != data:
             if 0 < len(data):
                 first = data[0]
                 if isinstance(first, str):
                     self.__projection = first
                 else:
-                    self.__arguments += data
+                    self.__index.add(data)
 
     def process(self):
 
@@ -34,8 +37,7 @@ class InteractiveTimeLineChartNode(Node):
             self.__chart.process(self.__projection, [])
             return
 
-        data = self.read()
-        filteredResult = WhiteList([self.__projection]).process(data)
+        filteredResult = WhiteList([self.__projection]).process(self.__index)
         filteredResult = EventCountAggregate(52).process(filteredResult)
         if 0 < len(filteredResult):
             self.__chart.process(self.__projection, filteredResult)
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+# An inverted index from tokens (the values of events, or the items of their token lists
+# produced by segmenters such as Words and CurrencyAbbreviations) to event positions.
+# Built once, it answers white list and black list queries by set lookups instead of
+# rescanning the time-line. As a stage, it indexes the incoming events and passes itself
+# on, and WhiteList and BlackList query it directly.
+class TokenIndex:
+
+    def __init__(self, timeLine=None):
+        self.clear()
+        if timeLine is not None:
+            self.add(timeLine)
+
+    def clear(self):
+        self.events = []
+        self.postings = {}
+
+    def process(self, timeLine):
+        self.add(timeLine)
+        return self
+
+    def add(self, timeLine):
+        position = len(self.events)
+        for i in range(len(timeLine)):
+            event = timeLine[i]
+            self.events.append(event)
+            for token in TokenIndex.tokens(event['value']):
+                postings = self.postings.get(token)
+                if postings is None:
+                    self.postings[token] = [position]
+                # Tokens repeated within an event are indexed once
+                elif postings[-1] != position:
+                    postings.append(position)
+            position += 1
+        return self
+
+    def __len__(self):
+        return len(self.events)
+
+    def __contains__(self, token):
+        return token in self.postings
+
+    # The number of events holding the token
+    def count(self, token):
+        return len(self.postings.get(token, ()))
+
+    # Sorted positions of the events holding any of the tokens
+    def positions(self, tokens):
+        postings = [self.postings[token] for token in set(tokens) if token in self.postings]
+        if 0 == len(postings):
+            return np.empty(0, dtype=np.int64)
+        if 1 == len(postings):
+            return np.asarray(postings[0], dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    # Events holding any of the tokens, their token lists reduced to these tokens
+    def select(self, tokens):
+        tokens = set(tokens)
+        results = []
+        for position in self.positions(tokens).tolist():
+            event = self.events[position]
+            segment = event['value']
+            if not TokenIndex.scalar(segment):
+                segment = [token for token in segment if token in tokens]
+            results.append({
+                'time': event['time'],
+                'value': segment
+            })
+        return results
+
+    # All events without the tokens; the events left with no tokens are dropped
+    def exclude(self, tokens):
+        tokens = set(tokens)
+        affected = set(self.positions(tokens).tolist())
+        results = []
+        for position in range(len(self.events)):
+            event = self.events[position]
+            if position not in affected:
+                results.append(event)
+            elif not TokenIndex.scalar(event['value']):
+                segment = type(event['value'])(token for token in event['value'] if token not in tokens)
+                if len(segment) != 0:
+                    results.append({
+                        'time': event['time'],
+                        'value': segment
+                    })
+        return results
+
+    @staticmethod
+    def scalar(value):
+        return isinstance(value, (int, str))
+
+    @staticmethod
+    def tokens(value):
+        if TokenIndex.scalar(value):
+            return (value,)
+        return value
@@ -0,0 +1,183 @@
+import json
+import mmap
+import codecs
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\r\n'
+_number = frozenset('0123456789.eE+-')
+
+
+# The JSON parser: the standard one, or orjson with "fast" set when it is installed.
+# orjson is faster, but rejects NaN and infinities and reads integers beyond 64 bits
+# as floats, so it is only used when asked for.
+def parser(fast=False):
+    return orjson.loads if fast and orjson is not None else json.loads
+
+
+# Reads bytes by "size" from a file name (memory-mapped with "mapped" set), bytes,
+# a memory map or a binary file-like object such as an HTTP response
+def read_chunks(source, size=1 << 20, mapped=False):
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            if mapped:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    yield from read_chunks(buffer, size)
+            else:
+                yield from read_chunks(file, size)
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        view = memoryview(source)
+        try:
+            for i in range(0, len(view), size):
+                yield bytes(view[i:i + size])
+        finally:
+            view.release()
+    else:
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+# Parses a JSON array or newline-delimited JSON (one document per line) incrementally,
+# holding only about "buffer_size" bytes of the input at once. The format is detected
+# from the first character unless given as "array" or "lines". Events are yielded one
+# by one by "stream" or in lists of "chunk_size" by "chunks". Lines are parsed with orjson
+# with "fast" set (see "parser").
+class JSONStream:
+
+    streamable = True
+
+    def __init__(self, source, format=None, chunk_size=10000, buffer_size=1 << 20, mapped=False, fast=False):
+        if format not in (None, 'array', 'lines'):
+            raise ValueError("Unknown JSON stream format: " + str(format))
+        self.source = source
+        self.format = format
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.mapped = mapped
+        self.fast = fast
+
+    def process(self, formal_argument=None):
+        return list(self.stream())
+
+    def stream(self, formal_argument=None):
+        chunks = read_chunks(self.source, self.buffer_size, self.mapped)
+        try:
+            # The format is told by the first significant byte, which may come after chunks of whitespace
+            first = b''
+            for chunk in chunks:
+                first += chunk
+                if first.strip():
+                    break
+            format = self.format
+            if format is None:
+                format = 'array' if first.lstrip()[:1] == b'[' else 'lines'
+            if 'array' == format:
+                yield from JSONStream.__array(first, chunks)
+            else:
+                yield from JSONStream.__lines(first, chunks, parser(self.fast))
+        finally:
+            chunks.close()
+
+    def chunks(self):
+        chunk = []
+        for event in self.stream():
+            chunk.append(event)
+            if self.chunk_size <= len(chunk):
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def __lines(first, chunks, loads):
+        rest = b''
+        for chunk in _prepend(first, chunks):
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield loads(line)
+        if rest.strip():
+            yield loads(rest)
+
+    @staticmethod
+    def __array(first, chunks):
+        text = codecs.getincrementaldecoder('utf-8')()
+        chunks = _prepend(first, chunks)
+        buffer = ''
+        position = 0
+        finished = False
+
+        # Appends the next chunk to the buffer, dropping the parsed part; False at the end
+        def more():
+            nonlocal buffer, position, finished
+            chunk = next(chunks, None)
+            finished = chunk is None
+            buffer = buffer[position:] + text.decode(chunk if chunk is not None else b'', finished)
+            position = 0
+            return not finished
+
+        # Moves to the next significant character, reading more input if needed
+        def skip(characters):
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in characters:
+                    position += 1
+                if position < len(buffer) or not more():
+                    return position < len(buffer)
+
+        # Reads the value at the position, which must be followed by a comma or the end of the array
+        def element():
+            nonlocal position
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if finished:
+                        raise
+                    more()
+                    continue
+                delimiter = end
+                while delimiter < len(buffer) and buffer[delimiter] in _whitespace:
+                    delimiter += 1
+                if delimiter < len(buffer) and buffer[delimiter] in ',]':
+                    position = end
+                    return value
+                # A number cut by the chunk end may continue: "1.5e" as "1.5e10"
+                if not finished and (delimiter == len(buffer) or _number.issuperset(buffer[end:])):
+                    more()
+                    continue
+                if delimiter == len(buffer):
+                    raise ValueError("Unterminated JSON array")
+                raise ValueError("A comma or the end of the JSON array is expected")
+
+        if not skip(_whitespace) or '[' != buffer[position]:
+            raise ValueError("A JSON array is expected")
+        position += 1
+        if not skip(_whitespace):
+            raise ValueError("Unterminated JSON array")
+        if ']' != buffer[position]:
+            while True:
+                yield element()
+                skip(_whitespace)
+                position += 1
+                if ']' == buffer[position - 1]:
+                    break
+                if not skip(_whitespace) or buffer[position] in ',]':
+                    raise ValueError("A value is expected after a comma in the JSON array")
+        else:
+            position += 1
+        if skip(_whitespace):
+            raise ValueError("Unexpected data after the JSON array")
+
+
+def _prepend(first, chunks):
+    yield first
+    yield from chunks
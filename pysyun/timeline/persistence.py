@@ -0,0 +1,183 @@
+import os
+import json
+import mmap
+import struct
+import datetime
+
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# A time-line file holds the events sorted by time in the ascending order:
+#   the header (magic, version, event count, value type, section offsets, index stride);
+#   the int64 time column;
+#   the value column: numbers as is, other values as int64 offsets into a blob of
+#   comma-terminated JSON documents, so any range of them is one JSON array to parse
+#   (values JSON has no type for are stored as text: dates and times in ISO-8601,
+#   sets as lists, others such as MongoDB ObjectId as their string form);
+#   the index footer: every "stride"-th time-stamp, to locate ranges touching few pages.
+# All sections are 8-byte aligned and little-endian.
+MAGIC = b'PSTL'
+VERSION = 1
+_header = struct.Struct('<4sHHQ8sQQQQQ')
+_headerSize = 64
+_json = b'json'
+
+
+def _aligned(size):
+    return (size + 7) // 8 * 8
+
+
+def _encode(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+# A sink stage writing time-lines to a file (replaced atomically) and passing them on
+class TimeLineWriter:
+
+    def __init__(self, file_name, stride=4096):
+        self.file_name = file_name
+        self.stride = stride
+
+    def process(self, timeLine):
+        write(self.file_name, timeLine, self.stride)
+        return timeLine
+
+
+# Writes a time-line (columnar or a list of events) sorted by time
+def write(file_name, timeLine, stride=4096):
+    ordered = TimeLine.of(timeLine).ascending()
+    times = np.ascontiguousarray(ordered.times, dtype='<i8')
+    values = ordered.values
+    count = len(times)
+
+    if values.dtype.kind in 'biuf':
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        kind = values.dtype.str.encode()
+        columns = [values.tobytes()]
+    else:
+        kind = _json
+        documents = [json.dumps(value, separators=(',', ':'), default=_encode).encode() + b','
+                     for value in values.tolist()]
+        offsets = np.zeros(count + 1, dtype='<i8')
+        np.cumsum([len(document) for document in documents], out=offsets[1:])
+        columns = [offsets.tobytes(), b''.join(documents)]
+    index = np.ascontiguousarray(times[::stride])
+
+    timesOffset = _headerSize
+    valuesOffset = timesOffset + _aligned(times.nbytes)
+    blobOffset = valuesOffset + _aligned(len(columns[0]))
+    indexOffset = blobOffset + (_aligned(len(columns[1])) if 1 < len(columns) else 0)
+
+    temporary_file_name = file_name + '.tmp'
+    with open(temporary_file_name, 'wb') as file:
+        header = _header.pack(MAGIC, VERSION, 0, count, kind.ljust(8, b'\0'),
+                              timesOffset, valuesOffset, blobOffset, indexOffset, stride)
+        file.write(header.ljust(_headerSize, b'\0'))
+        for offset, data in [(timesOffset, times.tobytes())] + list(zip([valuesOffset, blobOffset], columns)):
+            file.seek(offset)
+            file.write(data)
+        file.seek(indexOffset)
+        file.write(index.tobytes())
+    os.replace(temporary_file_name, file_name)
+
+
+# Opens a time-line file as a memory map. Times and numeric values are read as
+# zero-copy views of the map, so only the touched pages are loaded; JSON values
+# are parsed for the requested range only. As a source stage, returns the events
+# within [start, end].
+class TimeLineReader:
+
+    def __init__(self, file_name, start=None, end=None):
+        self.file_name = file_name
+        self.start = start
+        self.end = end
+        with open(file_name, 'rb') as file:
+            # The map outlives the file descriptor and is released with the last view
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, count, kind, timesOffset, valuesOffset, blobOffset, indexOffset, stride = \
+            _header.unpack_from(self.buffer)
+        if MAGIC != magic or VERSION != version:
+            raise ValueError("Not a time-line file: " + file_name)
+        kind = kind.rstrip(b'\0')
+        self.count = count
+        self.stride = stride
+        self.times = np.frombuffer(self.buffer, dtype='<i8', count=count, offset=timesOffset)
+        self.index = np.frombuffer(self.buffer, dtype='<i8', count=(count + stride - 1) // stride,
+                                   offset=indexOffset)
+        if _json == kind:
+            self.values = None
+            self.offsets = np.frombuffer(self.buffer, dtype='<i8', count=count + 1, offset=valuesOffset)
+            self.blobOffset = blobOffset
+        else:
+            self.values = np.frombuffer(self.buffer, dtype=kind.decode(), count=count, offset=valuesOffset)
+
+    def __len__(self):
+        return self.count
+
+    def process(self, formal_argument=None):
+        return self.window(self.start, self.end)
+
+    def timeLine(self):
+        return self.read(0, self.count)
+
+    # Events at positions [first, last) as a columnar time-line
+    def read(self, first, last):
+        if self.values is not None:
+            values = self.values[first:last]
+        else:
+            blob = self.blobOffset + int(self.offsets[first])
+            # Without the comma terminating the last document
+            end = self.blobOffset + int(self.offsets[last]) - 1
+            values = np.empty(last - first, dtype=object)
+            if first < last:
+                # The standard decoder reads back all the writer produces: NaN, infinities, big integers
+                values[:] = json.loads(b'[' + self.buffer[blob:end] + b']')
+        return TimeLine(self.times[first:last], values, ascending=True)
+
+    def window(self, start=None, end=None, start_inclusive=True, end_inclusive=True):
+        first, last = self.span(start, end, start_inclusive, end_inclusive)
+        return self.read(first, last)
+
+    # Positions of events within [start, end]; the index narrows each search to one block
+    def span(self, start=None, end=None, start_inclusive=True, end_inclusive=True):
+        first = 0 if start is None else self.__position(start, 'left' if start_inclusive else 'right')
+        last = self.count if end is None else self.__position(end, 'right' if end_inclusive else 'left')
+        return first, max(first, last)
+
+    def __position(self, time, side):
+        block = int(np.searchsorted(self.index, time, side))
+        low = max(0, block - 1) * self.stride
+        high = min(self.count, block * self.stride)
+        return low + int(np.searchsorted(self.times[low:high], time, side))
+
+
+# Exports a time-line as an Arrow table with "time" and "value" columns
+def to_arrow(timeLine):
+    if pyarrow is None:
+        raise ImportError("Arrow export requires the pyarrow package")
+    timeLine = TimeLine.of(timeLine)
+    values = timeLine.values
+    return pyarrow.table({
+        'time': pyarrow.array(timeLine.times),
+        'value': pyarrow.array(values if values.dtype != object else values.tolist())
+    })
+
+
+def to_parquet(timeLine, file_name):
+    if pyarrow is None:
+        raise ImportError("Parquet export requires the pyarrow package")
+    pyarrow.parquet.write_table(to_arrow(timeLine), file_name)
@@ -1,13 +1,104 @@
 import time
+import itertools
+from collections.abc import Iterator
 
 from compute.graph.structure import Node
 from compute.graph.structure import Synapse
 from compute.graph.profile import ProfileNode
 
+from pysyun.timeline.cache import MISSING, Cached
+from pysyun.timeline.columnar import TimeLine
+from pysyun.timeline.indexes import TokenIndex
+from pysyun.timeline.profiling import Measurement
+
+
+# Lazily runs a processor marked "streamable" (handling each event independently) over
+# an event stream: with its own "stream" method if it has one, otherwise by passing
+# chunks of "chunkSize" events to its "process" method
+def stream(processor, events, chunkSize=10000):
+    if not getattr(processor, 'streamable', False):
+        raise ValueError("The processor is not streamable: " + type(processor).__name__)
+    if hasattr(processor, 'stream'):
+        return processor.stream(events)
+    return _chunks(processor, iter(events), chunkSize)
+
+
+def _chunks(processor, events, chunkSize):
+    while True:
+        chunk = list(itertools.islice(events, chunkSize))
+        if 0 == len(chunk):
+            return
+        result = processor.process(chunk)
+        if result is not None:
+            yield from result
+
+
+# Measures a lazy stage while its stream is consumed. Each step also runs the upstream
+# stage feeding it, which measures itself the same way, so its time is subtracted.
+# The sample is passed to "record" once the stream is exhausted.
+class _MeasuredStream:
+
+    def __init__(self, events, upstream, record):
+        self.events = events
+        self.upstream = upstream
+        self.record = record
+        self.wall = 0
+        self.cpu = 0
+        self.count = 0
+        self.exhausted = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Chunked consumers ask an exhausted stream again; the sample is recorded once
+        if self.exhausted:
+            raise StopIteration
+        startCpu = time.thread_time_ns()
+        startWall = time.perf_counter_ns()
+        try:
+            event = next(self.events)
+        except StopIteration:
+            self.exhausted = True
+            self.__add(startWall, startCpu)
+            upstream = self.upstream
+            self.record({
+                'wall': self.wall - (upstream.wall if upstream is not None else 0),
+                'cpu': self.cpu - (upstream.cpu if upstream is not None else 0),
+                'input': upstream.count if upstream is not None else None,
+                'output': self.count
+            })
+            raise
+        self.__add(startWall, startCpu)
+        self.count += 1
+        return event
+
+    def __add(self, startWall, startCpu):
+        self.wall += time.perf_counter_ns() - startWall
+        self.cpu += time.thread_time_ns() - startCpu
+
+
+# Runs a processor measuring it where it runs, e.g. in a pool process, not in the waiting thread
+def _measured(processor, data, memory):
+    measurement = Measurement(memory).start()
+    result = processor.process(data)
+    return result, measurement.stop()
+
+
 class PipelineNode(Node):
 
-    def __init__(self, processor):
+    # In the streaming mode, stages able to stream pass lazy iterators to each other,
+    # and the others (sorting, clustering, etc.) get the stream materialized into a list.
+    # Each run is measured and recorded to the profiler under the stage name, if given.
+    # With a cache, the output is reused for the same processor configuration and input.
+    def __init__(self, processor, streaming=False, chunk_size=10000, profiler=None, name=None, cache=None):
         self.__processor = processor
+        self.__streaming = streaming
+        self.__chunkSize = chunk_size
+        self.__profiler = profiler
+        self.__name = name if name is not None else type(processor).__name__
+        self.__cached = Cached(processor, cache) if cache is not None else None
+        self.profile = None
         super().__init__()
 
     def __str__(self):
@@ -29,17 +120,84 @@ class PipelineNode(Node):
         for i in range(len(synapses)):
             neighborNode = synapses[i].node()
             if isinstance(neighborNode, ProfileNode):
-                neighborNode.write([self.delta])        
-        
-    def process(self):
+                neighborNode.write([self.delta])
+
+    def processor(self):
+        return self.__processor
+
+    # The processor may be run on the given executor (e.g. a process pool), in which case
+    # the data is passed materialized. Lazy stages are measured while their stream is
+    # consumed: until then their profile and delta hold None.
+    def process(self, executor=None):
         data = self.read()
-        startAmount = len(data) if None != data else 0
-        startTime = time.time()
-        data = self.__processor.process(data)
-        endTime = time.time()
-        endAmount = len(data) if None != data else 0
-        self.delta = {
-            "amount": endAmount - startAmount,
-            "time": endTime - startTime
-        }
+        streaming = self.__streaming and executor is None and self.__cached is None and self.__streamable(data)
+        if not streaming and isinstance(data, Iterator):
+            data = list(data)
+        startAmount = PipelineNode.__amount(data)
+        if streaming:
+            self.profile = {'wall': None, 'cpu': None, 'input': startAmount, 'output': None}
+            self.delta = {"amount": None, "time": None}
+            upstream = data if isinstance(data, _MeasuredStream) else None
+            events = stream(self.__processor, data if data is not None else [], self.__chunkSize)
+            data = _MeasuredStream(iter(events), upstream, self.__streamed)
+            # A stream is consumed once: materialize it for the last stage and for several neighbors
+            if 1 != self.__consumers():
+                data = list(data)
+        else:
+            data, self.profile = self.__run(data, executor)
+            endAmount = PipelineNode.__amount(data)
+            self.profile['input'] = startAmount
+            self.profile['output'] = endAmount
+            self.delta = {
+                "amount": endAmount - startAmount if None not in (startAmount, endAmount) else None,
+                "time": self.profile['wall'] / 1e9
+            }
+            if self.__profiler is not None:
+                self.__profiler.record(self.__name, self.profile)
         self.write(data)
+
+    # Completes the profile of a lazy stage once its stream is exhausted; the delta written
+    # to profile nodes is the same dictionary, so they see it too
+    def __streamed(self, sample):
+        if sample['input'] is None:
+            sample['input'] = self.profile['input']
+        self.profile.update(sample)
+        if sample['input'] is not None:
+            self.delta["amount"] = sample['output'] - sample['input']
+        self.delta["time"] = sample['wall'] / 1e9
+        if self.__profiler is not None:
+            self.__profiler.record(self.__name, self.profile)
+
+    # The result and its measurement
+    def __run(self, data, executor):
+        memory = self.__profiler is not None and self.__profiler.memory
+        if self.__cached is not None:
+            measurement = Measurement(memory).start()
+            key, result = self.__cached.lookup(data)
+            if result is not MISSING:
+                return result, measurement.stop()
+        if executor is not None:
+            result, sample = executor.submit(_measured, self.__processor, data, memory).result()
+        else:
+            result, sample = _measured(self.__processor, data, memory)
+        if self.__cached is not None:
+            self.__cached.store(key, result)
+        return result, sample
+
+    def __streamable(self, data):
+        # Columnar time-lines and token indexes are queried as a whole
+        if isinstance(data, (TimeLine, TokenIndex)):
+            return False
+        return getattr(self.__processor, 'streamable', False)
+
+    def __consumers(self):
+        synapses = self.synapses()
+        return sum(1 for synapse in synapses if not isinstance(synapse.node(), ProfileNode))
+
+    @staticmethod
+    def __amount(data):
+        if data is None:
+            return 0
+        if isinstance(data, Iterator):
+            return None
+        return len(data)
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import time
+import threading
+import tracemalloc
+
+import psutil
+
+
+# Measures one run of a stage: wall and CPU time of the running thread in nanoseconds,
+# and with "memory" set, the peak of Python allocations above the starting level
+# (tracemalloc) and the growth of the resident set size in bytes. Both are process-wide,
+# so they are None (not measured) when other memory measurements overlapped this one.
+class Measurement:
+
+    lock = threading.Lock()
+    active = 0
+    started = 0
+
+    def __init__(self, memory=False):
+        self.memory = memory
+
+    def start(self):
+        if self.memory:
+            with Measurement.lock:
+                Measurement.active += 1
+                Measurement.started += 1
+                self.shared = 1 < Measurement.active
+                self.startedBefore = Measurement.started
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                self.startTraced = tracemalloc.get_traced_memory()[0]
+            self.startResident = psutil.Process().memory_info().rss
+        self.startCpu = time.thread_time_ns()
+        self.startWall = time.perf_counter_ns()
+        return self
+
+    def stop(self):
+        sample = {
+            'wall': time.perf_counter_ns() - self.startWall,
+            'cpu': time.thread_time_ns() - self.startCpu
+        }
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            resident = psutil.Process().memory_info().rss
+            with Measurement.lock:
+                Measurement.active -= 1
+                shared = self.shared or Measurement.started != self.startedBefore
+            sample['peak'] = None if shared else max(0, peak - self.startTraced)
+            sample['resident'] = None if shared else resident - self.startResident
+        return sample
+
+
+# Aggregates stage measurements over runs and exports them as JSON, CSV, a text
+# flame-style chart or folded stacks for flame graph tools
+class Profiler:
+
+    fields = ['stage', 'calls', 'wall', 'wallMinimum', 'wallMaximum', 'cpu', 'peak', 'resident', 'input', 'output',
+              'throughput', 'share']
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, sample):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = {
+                    'calls': 0,
+                    'wall': 0,
+                    'wallMinimum': None,
+                    'wallMaximum': 0,
+                    'cpu': 0,
+                    'peak': 0,
+                    'resident': 0,
+                    'input': 0,
+                    'output': 0
+                }
+            total = self.stages[stage]
+            total['calls'] += 1
+            total['wall'] += sample['wall']
+            total['cpu'] += sample['cpu']
+            if total['wallMinimum'] is None or sample['wall'] < total['wallMinimum']:
+                total['wallMinimum'] = sample['wall']
+            total['wallMaximum'] = max(total['wallMaximum'], sample['wall'])
+            # Memory not measured (None) is left out
+            total['peak'] = max(total['peak'], sample.get('peak') or 0)
+            total['resident'] = max(total['resident'], sample.get('resident') or 0)
+            total['input'] += sample.get('input') or 0
+            total['output'] += sample.get('output') or 0
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+
+    # One row per stage; times in seconds, memory in bytes, throughput in input events per second
+    def report(self):
+        with self.lock:
+            stages = [(stage, dict(total)) for stage, total in self.stages.items()]
+        overall = sum(total['wall'] for stage, total in stages)
+        rows = []
+        for stage, total in stages:
+            row = {'stage': stage}
+            row.update(total)
+            for field in ('wall', 'wallMinimum', 'wallMaximum', 'cpu'):
+                row[field] = (row[field] or 0) / 1e9
+            row['throughput'] = row['input'] / row['wall'] if 0 < row['wall'] else None
+            row['share'] = total['wall'] / overall if 0 < overall else None
+            rows.append(row)
+        return rows
+
+    def to_json(self, file_name=None):
+        text = json.dumps(self.report(), indent=2)
+        return Profiler.__output(text, file_name)
+
+    def to_csv(self, file_name=None):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=Profiler.fields)
+        writer.writeheader()
+        writer.writerows(self.report())
+        return Profiler.__output(buffer.getvalue(), file_name)
+
+    # Stages as bars proportional to their share of the total wall time, the slowest first
+    def flame(self, width=50):
+        rows = sorted(self.report(), key=lambda row: row['wall'], reverse=True)
+        lines = []
+        for row in rows:
+            share = row['share'] or 0
+            lines.append('{0:<30} {1:<{2}} {3:6.1%} {4:10.3f}s {5:6d} calls'.format(
+                row['stage'][:30], '#' * int(round(share * width)), width, share, row['wall'], row['calls']))
+        return '\n'.join(lines)
+
+    # "pipeline;stage microseconds" lines, the input format of flamegraph.pl and speedscope
+    def folded(self, root='pipeline'):
+        return '\n'.join('{0};{1} {2}'.format(root, row['stage'], int(row['wall'] * 1e6)) for row in self.report())
+
+    @staticmethod
+    def __output(text, file_name):
+        if file_name is not None:
+            with open(file_name, 'w') as file:
+                file.write(text)
+        return text
@@ -4,11 +4,10 @@ import os.path
 import time
 import psutil
 
-from datetime import datetime
-
 # Matplotlib for simple charts
 import matplotlib.pyplot as plot
-from pysyun.timeline.statistics import MedianAggregateIndexes
+from pysyun.timeline.columnar import TimeLine
+from pysyun.timeline.downsampling import LargestTriangleThreeBuckets, M4
 
 # Plotly for interactive charts
 import plotly.graph_objs as go
@@ -22,36 +21,16 @@ except Exception:
 
 class DownsampledTimeLineChart:
 
-    def __init__(self, interval_count):
+    def __init__(self, interval_count, downsampler=None):
         self.intervalCount = interval_count
+        if downsampler is None:
+            downsampler = LargestTriangleThreeBuckets(interval_count)
+        self.downsampler = downsampler
 
     def process(self, time_line):
 
-        # Sort the time-line by time-stamps
-        time_line.sort(key=lambda value: value['time'])
-
-        # Extract values
-        values = []
-        for i in range(len(time_line)):
-            values.append(time_line[i]['value'])
-
-        # Extract dates and time-stamps
-        time_values = []
-        date_values = []
-        for i in range(len(time_line)):
-            seconds = time_line[i]['time'] / 1000
-            time_values.append(seconds)
-            date_values.append(datetime.utcfromtimestamp(seconds).strftime('%Y-%m-%d %H:%M'))
-
-        # Group the time-line into intervals by median
-        indexes = MedianAggregateIndexes(self.intervalCount).process(time_values)
-
-        # Projecting median indexes into dates and values
-        filtered_values = []
-        filtered_dates = []
-        for i in indexes:
-            filtered_values.append(values[i])
-            filtered_dates.append(date_values[i])
+        # Downsample the time-line sorted by time-stamps, keeping its visual peaks
+        time_line = self.downsampler.process(TimeLine.of(time_line))
 
         # Render the chart
         fig, ax = plot.subplots(figsize=(20, 10))
@@ -60,40 +39,43 @@ class DownsampledTimeLineChart:
         # Display the grid
         ax.grid(True)
         # Data to display
-        ax.plot(filtered_dates, filtered_values)
+        ax.plot(time_line.times.astype('datetime64[ms]'), time_line.values)
 
 
+# Renders time-lines as interactive Plotly charts. Time-lines longer than "width" pixels
+# are downsampled with M4, which keeps the rendered line intact, and traces of at least
+# "gl_threshold" points are drawn with WebGL. Time-lines may be lists of events, columnar
+# time-lines or (epoch milliseconds, values) array tuples.
 class InteractiveTimeLineChart:
 
-    def __init__(self, title, x_title, y_title):
+    def __init__(self, title, x_title, y_title, width=1920, gl_threshold=5000):
         self.traces = []
         self.title = title
         self.xTitle = x_title
         self.yTitle = y_title
+        self.width = width
+        self.glThreshold = gl_threshold
 
     # Renders one more time-line each time
     def process(self, time_line_name, time_line):
 
-        # Extract values
-        values = []
-        for i in range(len(time_line)):
-            values.append(time_line[i]['value'])
-
-        # Extract dates and time-stamps
-        date_values = []
-        for i in range(len(time_line)):
-            seconds = time_line[i]['time'] / 1000
-            date_values.append(datetime.utcfromtimestamp(seconds).strftime('%Y-%m-%d %H:%M'))
+        if isinstance(time_line, tuple):
+            time_line = TimeLine(*time_line)
+        time_line = TimeLine.of(time_line).ascending()
+        if self.width is not None:
+            time_line = M4(self.width).process(time_line)
 
         # Add the current time-line to the chart traces
-        trace = go.Scatter(
-            x=date_values,
-            y=values,
-            name=time_line_name
+        scatter = go.Scattergl if self.glThreshold <= len(time_line) else go.Scatter
+        trace = scatter(
+            x=time_line.times.astype('datetime64[ms]'),
+            y=time_line.values,
+            name=time_line_name,
+            **self.trace_options()
         )
         self.traces.append(trace)
 
-        if not time_line:
+        if 0 == len(time_line):
             # Render the chart
             layout = go.Layout(
                 title=self.title,
@@ -103,48 +85,15 @@ class InteractiveTimeLineChart:
             data = go.Figure(self.traces, layout=layout)
             data.show(renderer="colab")
 
+    def trace_options(self):
+        return {}
 
-class InteractiveScatterTimeLineChart:
-
-    def __init__(self, title, x_title, y_title):
-        self.traces = []
-        self.title = title
-        self.xTitle = x_title
-        self.yTitle = y_title
-
-    # Renders one more time-line each time
-    def process(self, time_line_name, time_line):
 
-        # Extract values
-        values = []
-        for i in range(len(time_line)):
-            values.append(time_line[i]['value'])
+class InteractiveScatterTimeLineChart(InteractiveTimeLineChart):
 
-        # Extract dates and time-stamps
-        date_values = []
-        for i in range(len(time_line)):
-            seconds = time_line[i]['time'] / 1000
-            date_values.append(datetime.utcfromtimestamp(seconds).strftime('%Y-%m-%d %H:%M'))
-
-        # Add the current time-line to the chart traces
-        trace = go.Scatter(
-            x=date_values,
-            y=values,
-            name=time_line_name,
-            # Display only markers not to fill empty intervals with lines
-            mode='markers'
-        )
-        self.traces.append(trace)
-
-        if not time_line:
-            # Render the chart
-            layout = go.Layout(
-                title=self.title,
-                xaxis=dict(title=self.xTitle),
-                yaxis=dict(title=self.yTitle)
-            )
-            data = go.Figure(self.traces, layout=layout)
-            data.show(renderer="colab")
+    def trace_options(self):
+        # Display only markers not to fill empty intervals with lines
+        return {'mode': 'markers'}
 
 
 class Console:
@@ -0,0 +1,106 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from compute.graph.profile import ProfileNode
+
+from pysyun.timeline.pipeline import PipelineNode
+
+# Marks the runs of root nodes, which take no input
+_ROOT = object()
+
+
+# Runs a pipeline graph like node activation does: each output is written to every
+# neighbor, which then processes it, so a node fed by several synapses runs once per
+# incoming output (as Add accumulates them). Different nodes run concurrently on
+# "workers" threads, the runs of one node are serialized. With "processes" set, the
+# processors of pipeline stages run on a process pool instead, for CPU-bound branches
+# (their processors and data must be picklable). Profile nodes receive the timing of
+# the stages feeding them instead of their data.
+# Synapses closing a cycle (self-loops included) are feedback the node state already
+# keeps, e.g. the "Add -> Add" accumulation: they are not followed.
+class Scheduler:
+
+    def __init__(self, workers=4, processes=False):
+        self.workers = workers
+        self.processes = processes
+
+    def process(self, roots):
+        if not isinstance(roots, (list, tuple)):
+            roots = [roots]
+        feedback = Scheduler.feedback(roots)
+        inputs = {}
+        busy = set()
+        running = {}
+
+        processPool = ProcessPoolExecutor(max_workers=self.workers) if self.processes else None
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as threadPool:
+
+                def start(node):
+                    if node not in busy and inputs.get(node):
+                        busy.add(node)
+                        data = inputs[node].popleft()
+                        running[threadPool.submit(Scheduler.__run, node, data, processPool)] = node
+
+                def deliver(node, data):
+                    inputs.setdefault(node, deque()).append(data)
+                    start(node)
+
+                for root in roots:
+                    deliver(root, _ROOT)
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node = running.pop(future)
+                        busy.discard(node)
+                        future.result()
+                        synapses = node.synapses()
+                        for i in range(len(synapses)):
+                            if (node, i) in feedback:
+                                continue
+                            neighbor = synapses[i].node()
+                            if isinstance(neighbor, ProfileNode):
+                                deliver(neighbor, [node.delta] if hasattr(node, 'delta') else [])
+                            else:
+                                deliver(neighbor, node.read())
+                        start(node)
+        finally:
+            if processPool is not None:
+                processPool.shutdown()
+
+    @staticmethod
+    def __run(node, data, processPool):
+        if data is not _ROOT:
+            node.write(data)
+        if processPool is not None and isinstance(node, PipelineNode):
+            node.process(processPool)
+        else:
+            node.process()
+
+    # The (node, synapse index) pairs of synapses leading back to a node being visited
+    # by a depth-first walk from the roots, which breaks every cycle
+    @staticmethod
+    def feedback(roots):
+        feedback = set()
+        visiting = set()
+        visited = set()
+        for root in roots:
+            if root in visited:
+                continue
+            visiting.add(root)
+            stack = [(root, 0)]
+            while stack:
+                node, i = stack.pop()
+                synapses = node.synapses()
+                if i == len(synapses):
+                    visiting.discard(node)
+                    visited.add(node)
+                    continue
+                stack.append((node, i + 1))
+                neighbor = synapses[i].node()
+                if neighbor in visiting:
+                    feedback.add((node, i))
+                elif neighbor not in visited:
+                    visiting.add(neighbor)
+                    stack.append((neighbor, 0))
+        return feedback
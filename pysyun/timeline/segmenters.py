@@ -3,6 +3,8 @@ import re
 # Builds a time-line containing currency abbreviations
 class CurrencyAbbreviations:
     
+    streamable = True
+
     def process(self, timeLine):
         newTimeLine = []
         for i in range(len(timeLine)):
@@ -22,6 +24,8 @@ class CurrencyAbbreviations:
 # Builds a time-line containing hyper-links
 class Hyperlinks:
     
+    streamable = True
+
     def process(self, timeLine):
         newTimeLine = []
         for i in range(len(timeLine)):
@@ -37,6 +41,8 @@ class Hyperlinks:
 
 class Words:
 
+    streamable = True
+
     def process(self, timeLine):
         newTimeLine = []
         for i in range(len(timeLine)):
@@ -1,19 +1,31 @@
+import os
 import re
 import ssl
 import json
 import time
 import requests
+import threading
 import urllib.request
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from bs4 import BeautifulSoup
-from pymongo import MongoClient, DESCENDING
+from pymongo import MongoClient, DESCENDING, InsertOne, UpdateOne
 from storage_timeline_client import Storage
 from pysyun.timeline.algebra import Add
+from pysyun.timeline.columnar import span
+from pysyun.timeline.ingestion import JSONStream
+from pysyun.timeline.transport import RateLimiter, RequestExecutor, html_parser, pooled_session, retry
 
 
 class StorageTimelineSchema:
     def __init__(self, uri, schema_name):
+        self.uri = uri
+        self.schema_name = schema_name
         self.schema = Storage(uri).schema(schema_name)
 
+    def cache_key(self):
+        return self.uri, self.schema_name
+
     def process(self, empty):
         result = []
         time_line_names = self.schema.list()
@@ -24,46 +36,153 @@ class StorageTimelineSchema:
 
 class StorageTimelineTimeline:
     def __init__(self, uri, schema_name, time_line_name):
+        self.uri = uri
+        self.schema_name = schema_name
+        self.time_line_name = time_line_name
         self.time_line = Storage(uri).schema(schema_name).time_line(time_line_name)
 
+    def cache_key(self):
+        return self.uri, self.schema_name, self.time_line_name
+
     def process(self, empty):
         return [self.time_line]
 
 
-class StorageTimelineStrings:
-    def process(self, time_lines):
-        results = []
-        cumulation = Add()
-        for timeLine in time_lines:
-            try:
-                values = timeLine.all_strings()
-                results = cumulation.process(values)
-            except:
-                print("Unable to fetch data from Storage.Timeline", timeLine.schema, timeLine.name)
-        return results
+# Keeps the time of the latest event read from each time-line (a high-water mark)
+# in a local JSON state file, so that subsequent runs only take newer events.
+# Marks updated by a run are pending until the caller commits them once the events
+# have been used (the pipeline succeeded); otherwise the next run reads them again.
+class Checkpoint:
+
+    def __init__(self, state_file_name):
+        self.state_file_name = state_file_name
+        self.lock = threading.Lock()
+        self.pending = {}
+
+        # Try to load prior state
+        self.state = {}
+        if os.path.exists(state_file_name):
+            with open(state_file_name) as file:
+                self.state = json.load(file)
+
+    def get(self, key):
+        return self.state.get(key)
+
+    def update(self, key, time_stamp):
+        with self.lock:
+            if key not in self.pending or self.pending[key] < time_stamp:
+                self.pending[key] = time_stamp
+
+    # Applies and saves the pending marks
+    def commit(self):
+        with self.lock:
+            for key, time_stamp in self.pending.items():
+                if key not in self.state or self.state[key] < time_stamp:
+                    self.state[key] = time_stamp
+            self.pending = {}
+        self.save()
+
+    # Drops the pending marks, e.g. after a failed run
+    def rollback(self):
+        with self.lock:
+            self.pending = {}
+
+    def save(self):
+        with self.lock:
+            # Write aside and replace not to leave a broken state file behind
+            temporary_file_name = self.state_file_name + '.tmp'
+            with open(temporary_file_name, 'w') as file:
+                json.dump(self.state, file)
+            os.replace(temporary_file_name, self.state_file_name)
+
+
+# Fetches Storage.Timeline time-lines concurrently, retrying failures, and merges them.
+# Time-lines failing all retries are reported in "errors" and skipped.
+# Events can be restricted to the [start, end] window; with a checkpoint, only events
+# newer than the ones taken by the last committed run are returned.
+class StorageTimelineFetch:
+
+    def __init__(self, workers=8, retries=3, backoff=0.5, start=None, end=None, checkpoint=None):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.start = start
+        self.end = end
+        self.checkpoint = checkpoint
+        self.errors = []
 
+    # The concurrency settings and the errors of the last run do not change the result
+    def cache_key(self):
+        checkpoint = self.checkpoint.state_file_name if self.checkpoint is not None else None
+        return self.start, self.end, checkpoint
+
+    def fetch(self, time_line):
+        raise NotImplementedError()
 
-class StorageTimelineDocuments:
     def process(self, time_lines):
+        self.errors = []
         results = []
-        cumulation = Add()
-        for timeLine in time_lines:
-            try:
-                values = timeLine.all_documents()
-                results = cumulation.process(values)
-            except:
-                print("Unable to fetch data from Storage.Timeline", timeLine.schema, timeLine.name)
-        return results
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for timeLine in time_lines:
+                future = executor.submit(retry, partial(self.fetch, timeLine), self.retries, self.backoff)
+                futures[future] = timeLine
+            for future in as_completed(futures):
+                timeLine = futures[future]
+                try:
+                    values = future.result()
+                except Exception as error:
+                    self.errors.append({
+                        'schema': timeLine.schema,
+                        'name': timeLine.name,
+                        'error': error
+                    })
+                    print("Unable to fetch data from Storage.Timeline", timeLine.schema, timeLine.name, error)
+                    continue
+                values.sort(key=lambda value: value['time'], reverse=True)
+                results.append(self.__window(timeLine, values))
+        return Add.merge(results)
+
+    def __window(self, time_line, values):
+        start = self.start
+        start_inclusive = True
+        if self.checkpoint is not None:
+            key = '{0}/{1}'.format(time_line.schema, time_line.name)
+            last = self.checkpoint.get(key)
+            if last is not None and (start is None or start <= last):
+                start = last
+                start_inclusive = False
+        first, last = span(values, start, self.end, start_inclusive)
+        values = values[first:last]
+        if self.checkpoint is not None and 0 < len(values):
+            self.checkpoint.update(key, values[0]['time'])
+        return values
+
+
+class StorageTimelineStrings(StorageTimelineFetch):
+    def fetch(self, time_line):
+        return time_line.all_strings()
+
+
+class StorageTimelineDocuments(StorageTimelineFetch):
+    def fetch(self, time_line):
+        return time_line.all_documents()
 
 
 class GoogleObserver:
 
+    streamable = True
+
     def __init__(self, storage_uri, kernel_identifier, from_timestamp=None):
         self.storageUri = storage_uri
         self.kernelIdentifier = kernel_identifier
         self.from_timestamp = from_timestamp
 
     def process(self, formal_argument):
+        return list(self.stream())
+
+    # Parses the response incrementally, so large exports are never held in memory at once
+    def stream(self, formal_argument=None):
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
@@ -71,8 +190,7 @@ class GoogleObserver:
         if self.from_timestamp is not None:
             uri_string += "&from=" + str(self.from_timestamp)
         with urllib.request.urlopen(uri_string, context=ssl_context) as url:
-            data = json.loads(url.read().decode())
-            return data
+            yield from JSONStream(url).stream()
 
 
 class GoogleObserverKeys:
@@ -117,9 +235,13 @@ class EthereumGasStation:
 
 class CVEBase:
     baseUri = 'https://www.cvedetails.com'
+    headers = {'accept': '*/*',
+               'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                             'Chrome/73.0.3683.86 Safari/537.36 OPR/60.0.3255.36'}
+    session = None
 
     def read_file(self, url):
-        file = requests.get(url)
+        file = self.shared_session().get(url)
         text = file.text
         return text
 
@@ -128,12 +250,23 @@ class CVEBase:
             url = base_uri + fragment
             result.append(url)
 
+    # One keep-alive connection pool for all CVE requests
+    @staticmethod
+    def shared_session():
+        if CVEBase.session is None:
+            CVEBase.session = pooled_session(headers=CVEBase.headers)
+        return CVEBase.session
+
 
 class CVEIdentifierYear(CVEBase):
+    listingUri = 'https://www.cvedetails.com/browse-by-date.php'
+
     def process(self, items):
+        return self.parse(self.read_file(self.listingUri))
+
+    def parse(self, text):
         result = []
-        listing_uri = 'https://www.cvedetails.com/browse-by-date.php'
-        fragments = re.findall('\/vulnerability-list\/year-[0-9]{4}\/vulnerabilities.html', self.read_file(listing_uri))
+        fragments = re.findall('\/vulnerability-list\/year-[0-9]{4}\/vulnerabilities.html', text)
         self.restore_uris(fragments, self.baseUri, result)
         return result
 
@@ -142,9 +275,14 @@ class CVEIdentifierPage(CVEBase):
     def process(self, items):
         result = []
         for uri in items:
-            fragments = re.findall('(\/vulnerability-list.php\?[0-9a-zA-Z_=&;]+)(?:\"\t title=\"Go to page [0-9\">]+)',
-                                   self.read_file(uri))
-            self.restore_uris(fragments, self.baseUri, result)
+            result.extend(self.parse(self.read_file(uri)))
+        return result
+
+    def parse(self, text):
+        result = []
+        fragments = re.findall('(\/vulnerability-list.php\?[0-9a-zA-Z_=&;]+)(?:\"\t title=\"Go to page [0-9\">]+)',
+                               text)
+        self.restore_uris(fragments, self.baseUri, result)
         return result
 
 
@@ -152,24 +290,28 @@ class CVEIdentifier(CVEBase):
     def process(self, items):
         result = []
         for uri in items:
-            fragments = re.findall('(?:[\<a-z0-9 =\"/]+)([0-9A-Z-]+)/(?:\")', self.read_file(uri))
-            for identifier in fragments:
+            for identifier in self.parse(self.read_file(uri)):
                 result.append({
                     'id': identifier
                 })
         return result
 
+    @staticmethod
+    def parse(text):
+        return re.findall('(?:[\<a-z0-9 =\"/]+)([0-9A-Z-]+)/(?:\")', text)
 
-class CVEDescription:
+
+class CVEDescription(CVEBase):
+
+    def __init__(self, parser=None):
+        self.parser = parser if parser is not None else html_parser()
 
     def __response(self, uri):
-        session = requests.Session()
-        headers = {'accept': '*/*',
-                   'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
-                                 'Chrome/73.0.3683.86 Safari/537.36 OPR/60.0.3255.36'}
+        r = self.shared_session().get(uri)
+        return self.parse(r.content)
 
-        r = session.get(uri, headers=headers)
-        soup = BeautifulSoup(r.content, 'html.parser')
+    def parse(self, content):
+        soup = BeautifulSoup(content, self.parser)
         divs = soup.find_all('table', id='cvssscorestable')
         files = divs[0]
         files = files.text
@@ -184,6 +326,83 @@ class CVEDescription:
         return time_line_identifiers
 
 
+# Crawls CVE descriptions starting from year listings (all years if none are given).
+# Listings, their pages and vulnerability pages are fetched on one bounded pool with a
+# shared connection pool and a per-host rate limit; every identifier is described as soon
+# as its page is parsed, without waiting for the other stages to finish.
+# Pages failing all retries are reported in "errors".
+class CVECrawler(CVEBase):
+
+    def __init__(self, workers=8, rate=4, retries=3, parser=None):
+        self.workers = workers
+        self.retries = retries
+        self.limiter = RateLimiter(rate)
+        self.session = pooled_session(workers, CVEBase.headers)
+        self.years = CVEIdentifierYear()
+        self.pages = CVEIdentifierPage()
+        self.descriptions = CVEDescription(parser)
+        self.errors = []
+
+    def cache_key(self):
+        return self.descriptions.parser
+
+    def read_file(self, url):
+        return self.__get(url).text
+
+    def __get(self, url):
+        def call():
+            self.limiter.wait(url)
+            response = self.session.get(url)
+            response.raise_for_status()
+            return response
+        return retry(call, self.retries)
+
+    def __year(self, uri):
+        return 'pages', self.pages.parse(self.read_file(uri))
+
+    def __page(self, uri):
+        return 'identifiers', CVEIdentifier.parse(self.read_file(uri))
+
+    def __describe(self, identifier):
+        content = self.__get('https://www.cvedetails.com/cve/' + identifier).content
+        return 'description', {
+            'id': identifier,
+            'description': self.descriptions.parse(content)
+        }
+
+    def process(self, items):
+        if 0 == len(items):
+            items = self.years.parse(self.read_file(CVEIdentifierYear.listingUri))
+        self.errors = []
+        results = []
+        identifiers = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self.__year, uri): uri for uri in items}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        kind, value = future.result()
+                    except Exception as error:
+                        self.errors.append({
+                            'uri': source,
+                            'error': error
+                        })
+                        continue
+                    if 'pages' == kind:
+                        for uri in value:
+                            pending[executor.submit(self.__page, uri)] = uri
+                    elif 'identifiers' == kind:
+                        for identifier in value:
+                            if identifier not in identifiers:
+                                identifiers.add(identifier)
+                                pending[executor.submit(self.__describe, identifier)] = identifier
+                    else:
+                        results.append(value)
+        return results
+
+
 class CoinMarketCapList:
 
     def __init__(self, page):
@@ -243,10 +462,14 @@ class CoinMarketCapList:
 
 class CopyAI:
 
-    def __init__(self, token, project_identifier, product_identifier):
+    def __init__(self, token, project_identifier, product_identifier, workers=8):
         self.token = token
         self.project_identifier = project_identifier
         self.product_identifier = product_identifier
+        self.executor = RequestExecutor(workers)
+
+    def cache_key(self):
+        return self.token, self.project_identifier, self.product_identifier
 
     def uri(self):
         return "https://api.copy.ai/v1/text-gen/generate"
@@ -279,73 +502,116 @@ class CopyAI:
 
     def process(self, data):
         results = []
+        calls = []
         for item in data:
-            response = requests.post(self.uri(), headers=self.headers(),
-                                     data=self.data(item["name"], item["description"], item["tone"],
-                                                    item["input_language"], item["output_language"]))
+            calls.append(('POST', self.uri(), {
+                'headers': self.headers(),
+                'data': self.data(item["name"], item["description"], item["tone"],
+                                  item["input_language"], item["output_language"])
+            }))
+        for response in self.executor.map(calls):
             response = json.loads(response.text)
             response = response["data"]["choices"]
             results.append(response)
         return results
 
 
+# Writes a time-line of documents into a MongoDB collection with unordered bulk writes
+# of "batch_size" operations (documents with an "_id" are upserted, others inserted),
+# or reads the most recent documents matching a filter.
+# Reads stream in batches of "batch_size" and return only the "projection" fields,
+# which must include "date". An index on "date" is ensured on the first access.
+# A client (e.g. a shared or a mock one) may be passed instead of connecting to the
+# connection string, which then only tells servers apart in cache keys.
 class MongoDBRecentEventsCollection:
 
-    def __init__(self, connection_string, database, collection, start=0, end=100):
-        self.connection = MongoClient(connection_string)
+    def __init__(self, connection_string, database, collection, start=0, end=100, batch_size=1000, ordered=False,
+                 projection=None, client=None):
+        self.connection_string = connection_string
+        self.connection = client if client is not None else MongoClient(connection_string)
         self.database = database
         self.collection = collection
         self.start = start
         self.end = end
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.projection = projection
+        self.indexed = False
+
+    def cache_key(self):
+        return self.connection_string, self.database, self.collection, self.start, self.end, self.projection
+
+    def events(self):
+        events = self.connection[self.database][self.collection]
+        if not self.indexed:
+            events.create_index([('date', DESCENDING)])
+            self.indexed = True
+        return events
 
     def process(self, filters):
 
         if 0 < len(filters) and "time" in filters[0]:
 
-            database = self.connection[self.database]
-            events = database[self.collection]
+            events = self.events()
 
             # The time-line was passed
+            operations = []
             for event in filters:
                 event_value = event["value"]
                 if "_id" in event_value:
-                    events.update_one({
+                    operations.append(UpdateOne({
                         "_id": event_value["_id"]
                     }, {
                         "$set": event_value
-                    })
+                    }, upsert=True))
                 else:
-                    events.insert_one(event_value)
+                    operations.append(InsertOne(event_value))
+                if self.batch_size <= len(operations):
+                    events.bulk_write(operations, ordered=self.ordered)
+                    operations = []
+            if 0 < len(operations):
+                events.bulk_write(operations, ordered=self.ordered)
             return filters
 
         else:
 
             # The filter was passed
-            results = []
-            query_filter = filters
-            if 0 < len(filters):
-                query_filter = filters[0]
-            database = self.connection[self.database]
-            events = database[self.collection].find(query_filter).sort([('date', DESCENDING)])[self.start:self.end]
-            for event in events:
-                date_value = event["date"]
-                date_value = int(date_value.timestamp()) * 1000
-                results.append({
-                    'time': date_value,
-                    'value': event
-                })
-            return results
+            return list(self.query(filters))
+
+    # Lazily yields the events matching the filter, the most recent first
+    def query(self, filters):
+        query_filter = {}
+        if 0 < len(filters):
+            query_filter = filters[0]
+        cursor = self.events().find(query_filter, self.projection).sort([('date', DESCENDING)])
+        cursor = cursor[self.start:self.end].batch_size(self.batch_size)
+        for event in cursor:
+            date_value = event["date"]
+            date_value = int(date_value.timestamp()) * 1000
+            yield {
+                'time': date_value,
+                'value': event
+            }
 
 
 class CopyAIReference:
 
-    def __init__(self, uri):
+    def __init__(self, uri, workers=8):
         self.uri = uri
+        self.executor = RequestExecutor(workers)
+
+    def cache_key(self):
+        return self.uri
 
     def process(self, data):
         results = []
+        calls = []
         for item in data:
-            response = requests.post(self.uri, json.dumps(item), headers={"Content-type": "application/json"})
+            calls.append(('POST', self.uri, {
+                'data': json.dumps(item),
+                'headers': {"Content-type": "application/json"}
+            }))
+        for response in self.executor.map(calls):
             response = json.loads(response.text)
             results += response
         return results
@@ -1,5 +1,9 @@
 from statistics import median_low
 
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+
 class MedianAggregateIndexes:
 
     def __init__(self, intervalCount):
@@ -8,7 +12,7 @@ class MedianAggregateIndexes:
     def process(self, coordinates):
         indexes = []
         length = len(coordinates)
-        step = int(length / self.intervalCount)
+        step = max(1, int(length / self.intervalCount))
         i = 0
         while i < length:
             section = coordinates[i:i+step]
@@ -17,52 +21,130 @@ class MedianAggregateIndexes:
             i = i + step
         return indexes
 
-class EventCountAggregate:
+# Aggregates a time-line into time buckets with one vectorized pass. The buckets are
+# either "intervalCount" buckets of equal width between the first and the last events,
+# buckets of a fixed "width" in milliseconds, or "calendar" aligned ones: minute, hour,
+# day, week (starting on Monday), month or year. Aggregations are count, sum, mean,
+# min, max, first, last, median and quantiles like "q0.95". Each bucket is reported by
+# its start time, several aggregations give dictionaries as values. Empty buckets are
+# skipped unless "empty" is set, in which case they count and sum 0, and the other
+# aggregations are NaN for floats and None otherwise (integer results stay integer in
+# an object column). The input time-line is not modified.
+class BinnedAggregate:
 
-    def __init__(self, intervalCount):
+    calendarUnits = {'minute': 'm', 'hour': 'h', 'day': 'D', 'week': 'W', 'month': 'M', 'year': 'Y'}
+
+    def __init__(self, intervalCount=None, width=None, calendar=None, aggregations='count', empty=False):
+        if 1 != sum(option is not None for option in (intervalCount, width, calendar)):
+            raise ValueError("Exactly one of intervalCount, width or calendar is expected")
+        if calendar is not None and calendar not in BinnedAggregate.calendarUnits:
+            raise ValueError("Unknown calendar unit: " + str(calendar))
+        if width is not None:
+            if width <= 0 or width != int(width):
+                raise ValueError("The width must be a positive whole number of milliseconds: " + str(width))
+            # Whole milliseconds keep bucket numbers and start times integer
+            width = int(width)
         self.intervalCount = intervalCount
+        self.width = width
+        self.calendar = calendar
+        self.aggregations = [aggregations] if isinstance(aggregations, str) else list(aggregations)
+        self.empty = empty
 
     def process(self, timeLine):
 
+        columnar = isinstance(timeLine, TimeLine)
+        timeLine = TimeLine.of(timeLine).ascending()
         if 0 == len(timeLine):
-            return []        
+            return TimeLine([], []) if columnar else []
 
-        newTimeLine = []
-        
-        timeLine.sort(key=lambda value: value['time'])
+        # Bucket numbers are non-decreasing since the time-line is sorted
+        starts, bins = self.__bins(timeLine.times)
+        counts = np.bincount(bins, minlength=len(starts))
+        present = np.flatnonzero(counts)
+        firsts = (np.cumsum(counts) - counts)[present]
 
-        # Minimum and maximum time stamps
-        i = 0
-        minimum = timeLine[0]['time']
-        maximum = minimum
-        while i < len(timeLine):
-            currentEventTime = timeLine[i]['time']
-            if currentEventTime < minimum:
-                minimum = currentEventTime
-            if maximum < currentEventTime:
-                maximum = currentEventTime
-            i = i + 1
-        
-        # Desired interval length
-        step = int((maximum - minimum) / self.intervalCount)
-        
-        # Process each interval
-        i = 0
-        length = len(timeLine)
-        currentIntervalStart = minimum
-        currentIntervalEnd = currentIntervalStart + step
-        currentEventCount = 0
-        while i < length:
-            currentEventTime = timeLine[i]['time']
-            currentEventCount = currentEventCount + 1
-            if currentIntervalEnd <= currentEventTime or i == length - 1:
-                newTimeLine.append({
-                    'time': currentEventTime,
-                    'value': currentEventCount
-                })
-                currentEventCount = 0
-                currentIntervalStart = currentIntervalStart + step
-                currentIntervalEnd = currentIntervalEnd + step
-            i = i + 1
-
-        return newTimeLine
+        columns = {}
+        for name in self.aggregations:
+            column = BinnedAggregate.aggregate(name, timeLine.values, bins, firsts, counts[present])
+            if self.empty:
+                if name in ('count', 'sum'):
+                    filled = np.zeros(len(starts), dtype=column.dtype)
+                elif 'f' == column.dtype.kind:
+                    filled = np.full(len(starts), np.nan)
+                else:
+                    filled = np.full(len(starts), None, dtype=object)
+                filled[present] = column
+                column = filled
+            columns[name] = column
+        if not self.empty:
+            starts = starts[present]
+
+        if 1 == len(self.aggregations):
+            result = TimeLine(starts, columns[self.aggregations[0]], ascending=True)
+        else:
+            rows = zip(*[columns[name].tolist() for name in self.aggregations])
+            result = TimeLine(starts, [dict(zip(self.aggregations, row)) for row in rows], ascending=True)
+        return result if columnar else result.events()
+
+    # Bucket start times and the bucket number of every event
+    def __bins(self, times):
+        minimum = times[0]
+        maximum = times[-1]
+        if self.intervalCount is not None:
+            width = (maximum - minimum) / self.intervalCount
+            if 0 == width:
+                return times[:1], np.zeros(len(times), dtype=np.int64)
+            bins = np.minimum(((times - minimum) / width).astype(np.int64), self.intervalCount - 1)
+            starts = minimum + (np.arange(self.intervalCount) * width).astype(np.int64)
+            return starts, bins
+        if self.width is not None:
+            origin = minimum - minimum % self.width
+            bins = (times - origin) // self.width
+            starts = origin + np.arange(bins[-1] + 1, dtype=np.int64) * self.width
+            return starts, bins
+        # Numpy weeks start on Thursday as the epoch does, shift them to start on Monday
+        shift = 3 * 24 * 3600 * 1000 if 'week' == self.calendar else 0
+        unit = 'datetime64[' + BinnedAggregate.calendarUnits[self.calendar] + ']'
+        ordinals = (times + shift).astype('datetime64[ms]').astype(unit).astype(np.int64)
+        bins = ordinals - ordinals[0]
+        starts = np.arange(ordinals[0], ordinals[-1] + 1).astype(unit).astype('datetime64[ms]').astype(np.int64)
+        return starts - shift, bins
+
+    # Aggregates values of consecutive buckets starting at "firsts" with "counts" events
+    @staticmethod
+    def aggregate(name, values, bins, firsts, counts):
+        if 'count' == name:
+            return counts
+        if 'first' == name:
+            return values[firsts]
+        if 'last' == name:
+            return values[firsts + counts - 1]
+        # Integer columns keep exact integer sums, minimums and maximums
+        if values.dtype.kind in 'biu' and name in ('sum', 'min', 'max'):
+            values = values.astype(np.int64)
+        else:
+            values = values.astype(np.float64)
+        if 'sum' == name:
+            return np.add.reduceat(values, firsts)
+        if 'mean' == name:
+            return np.add.reduceat(values, firsts) / counts
+        if 'min' == name:
+            return np.minimum.reduceat(values, firsts)
+        if 'max' == name:
+            return np.maximum.reduceat(values, firsts)
+        if 'median' == name or name.startswith('q'):
+            quantile = 0.5 if 'median' == name else float(name[1:])
+            # Values ordered within each bucket, with linear interpolation between them
+            ordered = values[np.lexsort((values, bins))]
+            positions = firsts + quantile * (counts - 1)
+            lower = np.floor(positions).astype(np.int64)
+            upper = np.ceil(positions).astype(np.int64)
+            return ordered[lower] + (ordered[upper] - ordered[lower]) * (positions - lower)
+        raise ValueError("Unknown aggregation: " + name)
+
+
+# Counts events in "intervalCount" equal time intervals
+class EventCountAggregate(BinnedAggregate):
+
+    def __init__(self, intervalCount):
+        super().__init__(intervalCount=intervalCount, aggregations='count', empty=True)
@@ -0,0 +1,112 @@
+import time
+import threading
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Calls the function, retrying failures with an exponential backoff
+def retry(call, retries=3, backoff=0.5, exceptions=(Exception,)):
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except exceptions:
+            if retries <= attempt:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
+
+
+# A session keeping up to "pool_size" connections per host alive for concurrent workers
+def pooled_session(pool_size=16, headers=None):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers is not None:
+        session.headers.update(headers)
+    return session
+
+
+# The fastest available BeautifulSoup parser
+def html_parser():
+    try:
+        import lxml
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+# Spaces requests to the same host at least 1 / "rate" seconds apart across threads
+class RateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def wait(self, uri):
+        host = urlparse(uri).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.slots.get(host, now))
+            self.slots[host] = slot + self.interval
+        if now < slot:
+            time.sleep(slot - now)
+
+
+# Seconds to wait according to the Retry-After header, if any
+def retry_after(response):
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+# Sends HTTP requests concurrently over keep-alive connections with at most "workers"
+# requests in flight. Connection failures and 429 / 5xx responses are retried with an
+# exponential backoff or after the Retry-After delay. Responses keep the request order.
+class RequestExecutor:
+
+    retryStatuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, workers=8, retries=3, backoff=0.5, session=None):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.session = session if session is not None else pooled_session(workers)
+
+    def send(self, method, uri, **arguments):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, uri, **arguments)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.retries <= attempt:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in self.retryStatuses or self.retries <= attempt:
+                    return response
+                delay = retry_after(response)
+            time.sleep(delay if delay is not None else self.backoff * 2 ** attempt)
+            attempt += 1
+
+    # Sends (method, uri, arguments) requests and returns their responses in the same order
+    def map(self, calls):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.send, method, uri, **arguments) for method, uri, arguments in calls]
+            return [future.result() for future in futures]
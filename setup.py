@@ -9,7 +9,11 @@ setup(
     py_modules=['pysyun.timeline.algebra', 'pysyun.timeline.converters', 'pysyun.timeline.filters',
                 'pysyun.timeline.graph', 'pysyun.timeline.reducers', 'pysyun.timeline.segmenters',
                 'pysyun.timeline.sources', 'pysyun.timeline.statistics', 'pysyun.timeline.renderers',
-                'pysyun.timeline.pipeline'],
-    install_requires=['requests', 'pymongo', 'pandas', 'scipy', 'scikit-learn', 'beautifulsoup4', 'plotly', 'matplotlib',
+                'pysyun.timeline.pipeline', 'pysyun.timeline.columnar',
+                'pysyun.timeline.downsampling', 'pysyun.timeline.transport',
+                'pysyun.timeline.cache', 'pysyun.timeline.scheduler',
+                'pysyun.timeline.profiling', 'pysyun.timeline.ingestion',
+                'pysyun.timeline.persistence', 'pysyun.timeline.indexes'],
+    install_requires=['requests', 'pymongo', 'numpy', 'pandas', 'scipy', 'scikit-learn', 'beautifulsoup4', 'plotly', 'matplotlib',
                       'psutil', 'transformers']
 )
@@ -0,0 +1,39 @@
+import numpy as np
+
+from pysyun.timeline.algebra import Join
+from pysyun.timeline.columnar import TimeLine
+
+
+def events(pairs):
+    return [{'time': time, 'value': value} for time, value in pairs]
+
+
+def test_inner_join_takes_one_value_per_repeated_time_stamp():
+    first, second = Join('inner').process([events([(1, 10), (2, 20), (2, 21), (3, 30)]),
+                                           events([(2, 'b'), (3, 'c'), (3, 'd'), (4, 'e')])])
+    assert [2, 3] == first.times.tolist() == second.times.tolist()
+    assert [20, 30] == first.values.tolist()
+    assert ['b', 'c'] == second.values.tolist()
+
+
+def test_outer_join_fills_missing_values_by_type():
+    numbers, texts, units = Join('outer').process([events([(1, 1.5), (3, 3.5)]), events([(2, 'b'), (3, 'c')]),
+                                                   TimeLine([3, 4], np.array(['x', 'y']))])
+    assert [1, 2, 3, 4] == numbers.times.tolist()
+    assert np.isnan(numbers.values[[1, 3]]).all() and [1.5, 3.5] == numbers.values[[0, 2]].tolist()
+    assert [None, 'b', 'c', None] == texts.values.tolist()
+    assert [None, None, 'x', 'y'] == units.values.tolist()
+
+
+def test_asof_join_respects_the_tolerance():
+    first, second = Join('asof', tolerance=2).process([events([(1, 1), (5, 5), (10, 10)]),
+                                                       events([(0, 'a'), (4, 'b')])])
+    assert [1, 5] == first.times.tolist()
+    assert ['a', 'b'] == second.values.tolist()
+
+
+def test_interpolate_join_within_the_common_range():
+    first, second = Join('interpolate').process([events([(0, 0), (10, 10)]), events([(5, 1), (15, 3)])])
+    assert [5, 10] == first.times.tolist()
+    assert [5.0, 10.0] == first.values.tolist()
+    assert [1.0, 2.0] == second.values.tolist()
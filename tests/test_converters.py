@@ -0,0 +1,28 @@
+import warnings
+
+import pytest
+
+from pysyun.timeline.converters import JSONArray
+
+
+def times(dates, formats=None):
+    events = [{'date': date, 'text': str(i)} for i, date in enumerate(dates)]
+    return [event['time'] for event in JSONArray('date', 'text', formats).process(events)]
+
+
+def test_dates_with_and_without_offsets():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert times(['2020-01-01T00:00:00Z', '2020-01-01T03:00:00+03:00', '2020-01-01',
+                      '2020-01-01T00:00:00.5-0100', '2020-01-01 01:00+01']) == \
+            [1577836800000, 1577836800000, 1577836800000, 1577840400500, 1577836800000]
+
+
+def test_other_layouts_use_formats():
+    assert times(['01.01.2020', '2020-01-01T00:00:00Z'], ['%d.%m.%Y']) == [1577836800000, 1577836800000]
+
+
+@pytest.mark.parametrize('dates', [['', '2020-01-01'], ['NaT'], ['yesterday']])
+def test_invalid_dates_are_rejected(dates):
+    with pytest.raises(ValueError):
+        times(dates)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from pysyun.timeline.columnar import TimeLine
+from pysyun.timeline.downsampling import M4, LargestTriangleThreeBuckets, MinMaxBuckets
+
+
+def lttb(times, values, threshold):
+    # The reference algorithm, point by point
+    length = len(times)
+    edges = [int(edge) for edge in np.linspace(1, length - 1, threshold - 1)]
+    result = [0]
+    for i in range(threshold - 2):
+        if i + 2 < len(edges):
+            bucket = range(edges[i + 1], edges[i + 2])
+            nextX = sum(float(times[j]) for j in bucket) / len(bucket)
+            nextY = sum(float(values[j]) for j in bucket) / len(bucket)
+        else:
+            nextX, nextY = float(times[-1]), float(values[-1])
+        a = result[-1]
+        areas = [abs((times[a] - nextX) * (values[j] - values[a]) - (times[a] - times[j]) * (nextY - values[a]))
+                 for j in range(edges[i], edges[i + 1])]
+        result.append(edges[i] + areas.index(max(areas)))
+    return result + [length - 1]
+
+
+def buckets(times, values, bucketCount):
+    # First, last, minimum and maximum positions of every time bucket
+    width = (times[-1] - times[0]) / bucketCount
+    groups = {}
+    for i in range(len(times)):
+        groups.setdefault(min(int((times[i] - times[0]) / width), bucketCount - 1), []).append(i)
+    return [(group[0], group[-1], min(group, key=lambda i: values[i]), max(group, key=lambda i: values[i]))
+            for group in groups.values()]
+
+
+@pytest.mark.parametrize('threshold', [3, 10, 99])
+def test_lttb_matches_the_reference(threshold):
+    rng = np.random.default_rng(threshold)
+    times = np.cumsum(rng.integers(1, 10, 1000))
+    values = rng.normal(size=1000).cumsum()
+    indexes = LargestTriangleThreeBuckets(threshold).indexes(times, values)
+    assert indexes.tolist() == lttb(times, values, threshold)
+
+
+def test_lttb_keeps_short_time_lines():
+    timeLine = [{'time': time, 'value': time % 3} for time in range(5)]
+    assert LargestTriangleThreeBuckets(10).process(timeLine) == timeLine
+
+
+def test_m4_matches_the_reference():
+    rng = np.random.default_rng(4)
+    times = np.sort(rng.integers(0, 100000, 2000))
+    values = rng.normal(size=2000)
+    expected = set()
+    for first, last, minimum, maximum in buckets(times, values, 50):
+        expected.update([first, last, minimum, maximum])
+    assert M4(50).indexes(times, values).tolist() == sorted(expected)
+
+    expected = set()
+    for first, last, minimum, maximum in buckets(times, values, 50):
+        expected.update([minimum, maximum])
+    assert MinMaxBuckets(50).indexes(times, values).tolist() == sorted(expected)
+
+
+def test_m4_skips_missing_values_and_sorts():
+    times = np.arange(100)[::-1].copy()
+    values = np.where(np.arange(100) % 7 == 0, np.nan, np.arange(100) % 10).astype(np.float64)
+    result = M4(5).process(TimeLine(times, values))
+    assert isinstance(result, TimeLine)
+    assert np.all(np.diff(result.times) > 0)
+    # Every bucket of 20 events holds the values 0 to 9, some of them missing
+    for bucket in range(5):
+        kept = result.values[result.times // 20 == bucket]
+        assert 0 in kept and 9 in kept
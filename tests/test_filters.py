@@ -0,0 +1,70 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pysyun.timeline.cache import fingerprint
+from pysyun.timeline.filters import JSON, KMeansClustering, RegularExpressionWhiteList
+
+
+@pytest.mark.parametrize('expressions, segment, matched', [
+    (['https:\\/\\/t\\.me\\/', 'x'], 'https://t.me/channel', True),
+    (['https:\\/\\/t\\.me\\/', 'x'], 'http://t.me/channel', False),
+    (['a+b', 'c.d'], 'cXd', True),
+    (['(?i)t\\.me', 'x'], 'T.ME', True),
+    (['(x)y\\1', '(a)b\\1'], 'abab', True),
+    (['(x)y\\1', '(a)b\\1'], 'abb', False),
+    (['(?P<host>a)b', '(?P<host>c)d'], 'cd', True),
+    (['(?P<host>a)b(?P=host)', 'x'], 'aba', True)
+])
+def test_regular_expression_white_list(expressions, segment, matched):
+    assert RegularExpressionWhiteList(expressions).matches(segment) == matched
+
+
+def test_regular_expression_white_list_filters_segments():
+    timeLine = [{'time': 1, 'value': ['abc', 'xyz', 'abc']}, {'time': 2, 'value': ['xyz']}]
+    assert RegularExpressionWhiteList(['ab', 'c+']).process(timeLine) == [{'time': 1, 'value': ['abc', 'abc']}]
+
+
+@pytest.mark.parametrize('method', ['gaps', 'optimal', 'minibatch'])
+def test_k_means_clustering_separates_groups(method):
+    times = [0, 1, 2, 3, 1000, 1001, 1002, 5000, 5001, 5003]
+    timeLine = [{'time': time, 'value': None} for time in times]
+    clusters = [event['value'] for event in KMeansClustering(3, method=method).process(timeLine)]
+    assert clusters == [1, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+
+def test_k_means_clustering_optimal_matches_exhaustive_search():
+    # Optimal 1-D K-means splits sorted values into contiguous runs
+    rng = np.random.default_rng(3)
+    times = np.sort(rng.integers(0, 100, 12))
+    timeLine = [{'time': int(time), 'value': None} for time in times]
+    clusters = np.array([event['value'] for event in KMeansClustering(3, method='optimal').process(timeLine)])
+
+    def inertia(labels):
+        return sum(((times[labels == label] - times[labels == label].mean()) ** 2).sum() for label in set(labels))
+
+    best = min(inertia(np.searchsorted([first, second], np.arange(len(times)), 'right'))
+               for first, second in itertools.combinations(range(1, len(times)), 2))
+    assert inertia(clusters) == pytest.approx(best)
+
+
+def test_k_means_clustering_elbow_is_remembered(monkeypatch):
+    timeLine = [{'time': time, 'value': None} for time in [0, 1, 2, 1000, 1001, 1002, 5000, 5001]]
+    elbows = []
+    elbow = KMeansClustering.elbow
+    monkeypatch.setattr(KMeansClustering, 'elbow', staticmethod(lambda *arguments: elbows.append(1) or elbow(*arguments)))
+    clustering = KMeansClustering(method='gaps')
+    key = fingerprint(clustering)
+
+    first = clustering.process(timeLine)
+    assert clustering.process(timeLine) == first
+    assert 1 == len(elbows)
+    clustering.process(timeLine[:-1])
+    assert 2 == len(elbows)
+    assert fingerprint(clustering) == key
+
+
+def test_json_keeps_the_standard_dialect():
+    events = JSON().process([{'time': 1, 'value': '[1180591620717411303424, Infinity]'}])
+    assert [2 ** 70, float('inf')] == events[0]['value']
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+from pysyun.timeline.ingestion import JSONStream
+
+buffer_sizes = [1, 2, 3, 1 << 20]
+
+
+@pytest.mark.parametrize('buffer_size', buffer_sizes)
+@pytest.mark.parametrize('source, events', [
+    (b'  [ ]', []),
+    (b'\n\n  [1, 2]', [1, 2]),
+    (b'\n\n{"a": 1}\n\n{"a": 2}', [{'a': 1}, {'a': 2}]),
+    (b'', [])
+])
+def test_format_is_detected_past_leading_whitespace(source, events, buffer_size):
+    assert JSONStream(source, buffer_size=buffer_size).process() == events
+
+
+def test_file_like_sources_and_chunks(tmp_path):
+    file_name = str(tmp_path / 'events.ndjson')
+    with open(file_name, 'wb') as file:
+        file.write(b''.join(b'{"time": %d}\n' % time for time in range(25)))
+    for source in (file_name, io.BytesIO(open(file_name, 'rb').read())):
+        chunks = list(JSONStream(source, chunk_size=10, buffer_size=7).chunks())
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert 25 == len(JSONStream(file_name, mapped=True).process())
+
+
+@pytest.mark.parametrize('buffer_size', buffer_sizes)
+def test_array_elements(buffer_size):
+    source = b'[1, 2.5e3 ,{"a": [1, 2]}, "x,]", -1.5e-3, true, null ]  \n'
+    assert JSONStream(source, buffer_size=buffer_size).process() == [1, 2500.0, {'a': [1, 2]}, 'x,]', -0.0015, True, None]
+
+
+@pytest.mark.parametrize('buffer_size', buffer_sizes)
+@pytest.mark.parametrize('source, message', [
+    (b'[1,,2]', 'after a comma'),
+    (b'[1,]', 'after a comma'),
+    (b'[,1]', 'Expecting value'),
+    (b'[1]garbage', 'after the JSON array'),
+    (b'[1] [2]', 'after the JSON array'),
+    (b'[1 2]', 'A comma or the end'),
+    (b'["a" "b"]', 'A comma or the end'),
+    (b'[1, 2', 'Unterminated'),
+    (b'[', 'Unterminated')
+])
+def test_malformed_arrays_are_rejected(source, message, buffer_size):
+    with pytest.raises(ValueError, match=message):
+        JSONStream(source, buffer_size=buffer_size).process()
+
+
+def test_lines_keep_the_standard_json_dialect():
+    source = b'{"big": 1180591620717411303424, "missing": NaN}\n'
+    event = JSONStream(source).process()[0]
+    assert 2 ** 70 == event['big'] and event['missing'] != event['missing']
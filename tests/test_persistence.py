@@ -0,0 +1,46 @@
+import numpy as np
+
+from pysyun.timeline.columnar import TimeLine
+from pysyun.timeline.persistence import TimeLineReader, TimeLineWriter, write
+from pysyun.timeline.statistics import BinnedAggregate
+
+
+def test_numeric_round_trip_and_windows(tmp_path):
+    file_name = str(tmp_path / 'numbers.tl')
+    times = np.random.default_rng(1).integers(0, 1000, 5000)
+    timeLine = TimeLine(np.sort(times)[::-1].copy(), np.random.default_rng(2).random(5000))
+    TimeLineWriter(file_name, stride=64).process(timeLine)
+
+    reader = TimeLineReader(file_name)
+    ordered = timeLine.ascending()
+    assert len(reader) == 5000
+    assert np.array_equal(reader.timeLine().times, ordered.times)
+    assert np.array_equal(reader.timeLine().values, ordered.values)
+    for start, end in [(-5, 3), (100, 200), (500, 500), (990, 2000)]:
+        for start_inclusive in (True, False):
+            for end_inclusive in (True, False):
+                window = reader.window(start, end, start_inclusive, end_inclusive)
+                expected = ordered.window(start, end, start_inclusive, end_inclusive)
+                assert np.array_equal(window.times, expected.times)
+                assert np.array_equal(window.values, expected.values)
+
+
+def test_json_values_round_trip(tmp_path):
+    file_name = str(tmp_path / 'documents.tl')
+    events = [{'time': i, 'value': {'text': 'é' * i, 'big': 2 ** 70, 'infinite': float('inf')}} for i in range(100)]
+    write(file_name, events, stride=7)
+
+    reader = TimeLineReader(file_name)
+    assert reader.timeLine().events() == events
+    assert reader.window(10, 19).events() == events[10:20]
+    assert reader.window(1000, 2000).events() == []
+
+
+def test_aggregates_with_empty_buckets_round_trip(tmp_path):
+    file_name = str(tmp_path / 'aggregates.tl')
+    events = [{'time': time, 'value': time} for time in (0, 5, 30)]
+    write(file_name, BinnedAggregate(width=10, aggregations=['count', 'mean'], empty=True).process(events))
+
+    values = TimeLineReader(file_name).timeLine().events()
+    assert [value['value']['count'] for value in values] == [2, 0, 0, 1]
+    assert np.isnan(values[1]['value']['mean'])
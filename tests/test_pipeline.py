@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip('compute')
+
+from pysyun.timeline.filters import DateRange, Lowercase
+from pysyun.timeline.pipeline import PipelineNode
+from pysyun.timeline.profiling import Profiler
+
+
+class Source:
+
+    def __init__(self, events):
+        self.events = events
+
+    def process(self, formal_argument=None):
+        return self.events
+
+
+class Sink:
+
+    def __init__(self):
+        self.received = None
+
+    def process(self, timeLine):
+        self.received = timeLine
+        return timeLine
+
+
+def test_streamed_stages_are_recorded_once():
+    events = [{'time': time, 'value': 'A' + str(time)} for time in range(10)]
+    profiler = Profiler()
+    sink = Sink()
+    nodes = [
+        PipelineNode(Source(events), profiler=profiler),
+        PipelineNode(DateRange(2, 8), streaming=True, chunk_size=3, profiler=profiler),
+        PipelineNode(Lowercase(), streaming=True, chunk_size=3, profiler=profiler),
+        PipelineNode(sink, profiler=profiler)
+    ]
+    for node, neighbor in zip(nodes, nodes[1:]):
+        node.add(neighbor)
+
+    nodes[0].activate()
+
+    assert sink.received == [{'time': time, 'value': 'a' + str(time)} for time in range(2, 9)]
+    stages = profiler.stages
+    assert (stages['DateRange']['calls'], stages['DateRange']['input'], stages['DateRange']['output']) == (1, 10, 7)
+    assert (stages['Lowercase']['calls'], stages['Lowercase']['input'], stages['Lowercase']['output']) == (1, 7, 7)
+    assert (stages['Sink']['calls'], stages['Sink']['input'], stages['Sink']['output']) == (1, 7, 7)
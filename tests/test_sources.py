@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+pytest.importorskip('storage_timeline_client')
+
+from pymongo import UpdateOne
+
+from pysyun.timeline.sources import MongoDBRecentEventsCollection
+
+
+# mongomock releases may not know the arguments newer pymongo passes to bulk updates
+def bulk_updates():
+    try:
+        mongomock.MongoClient()['probe']['probe'].bulk_write([UpdateOne({'_id': 1}, {'$set': {'a': 1}}, upsert=True)])
+        return True
+    except TypeError:
+        return False
+
+
+def collection(**arguments):
+    return MongoDBRecentEventsCollection('mongodb://localhost', 'events', 'posts', client=mongomock.MongoClient(),
+                                         **arguments)
+
+
+def date(day):
+    return datetime.datetime(2024, 1, day)
+
+
+@pytest.mark.skipif(not bulk_updates(), reason="mongomock does not support bulk updates of this pymongo")
+def test_documents_are_inserted_and_upserted_in_batches():
+    events = collection(batch_size=2)
+    timeLine = [{'time': i, 'value': {'date': date(i), 'text': str(i)}} for i in range(1, 4)]
+    timeLine.append({'time': 4, 'value': {'_id': 'pinned', 'date': date(4), 'text': 'first'}})
+    assert events.process(timeLine) is timeLine
+    events.process([{'time': 5, 'value': {'_id': 'pinned', 'date': date(5), 'text': 'second'}}])
+
+    stored = events.connection['events']['posts']
+    assert 4 == stored.count_documents({})
+    assert 'second' == stored.find_one({'_id': 'pinned'})['text']
+    assert any(index['key'] == [('date', -1)] for index in stored.index_information().values())
+
+
+def test_recent_documents_are_read_the_most_recent_first():
+    events = collection(start=1, end=3, projection={'date': 1, 'text': 1, '_id': 0})
+    events.process([{'time': i, 'value': {'date': date(i), 'text': str(i), 'kind': i % 2}} for i in range(1, 6)])
+
+    recent = events.process([])
+    assert [event['value']['text'] for event in recent] == ['4', '3']
+    assert recent[0]['time'] - recent[1]['time'] == 24 * 60 * 60 * 1000
+    assert [event['value']['text'] for event in events.process([{'kind': 1}])] == ['3', '1']
+    assert ['date', 'text'] == sorted(events.process([])[0]['value'])
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from pysyun.timeline.columnar import TimeLine
+from pysyun.timeline.statistics import BinnedAggregate
+
+
+def test_empty_buckets_keep_integer_results_exact():
+    timeLine = TimeLine([0, 5, 30], [5, 2, 2 ** 62])
+    result = BinnedAggregate(width=10, aggregations=['count', 'sum', 'min', 'max', 'first', 'mean'],
+                             empty=True).process(timeLine)
+    assert [0, 10, 20, 30] == result.times.tolist()
+    values = result.values.tolist()
+    assert [2, 0, 0, 1] == [value['count'] for value in values]
+    assert [7, 0, 0, 2 ** 62] == [value['sum'] for value in values]
+    assert [2, None, None, 2 ** 62] == [value['min'] for value in values]
+    assert [5, None, None, 2 ** 62] == [value['max'] for value in values]
+    assert [5, None, None, 2 ** 62] == [value['first'] for value in values]
+    assert 3.5 == values[0]['mean'] and np.isnan(values[1]['mean'])
+
+
+def test_empty_buckets_of_floats_are_nan():
+    result = BinnedAggregate(width=10, aggregations='min', empty=True).process(TimeLine([0, 20], [1.5, 2.5]))
+    assert np.float64 == result.values.dtype
+    assert 1.5 == result.values[0] and np.isnan(result.values[1])
+
+
+def test_quantiles_and_calendar_buckets():
+    day = 24 * 3600 * 1000
+    events = [{'time': time, 'value': value} for time, value in [(0, 1), (1, 3), (2, 2), (day + 5, 10)]]
+    result = BinnedAggregate(calendar='day', aggregations=['median', 'q0.5', 'q1']).process(events)
+    assert [0, day] == [event['time'] for event in result]
+    assert {'median': 2.0, 'q0.5': 2.0, 'q1': 3.0} == result[0]['value']
+
+
+def test_width_must_be_whole_milliseconds():
+    with pytest.raises(ValueError):
+        BinnedAggregate(width=0.5)
@@ -0,0 +1,99 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pysyun.timeline.transport import RateLimiter, RequestExecutor, retry, retry_after
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    # Paths answered with 503 before succeeding, and the requests seen
+    failures = {}
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Handler.lock:
+            Handler.requests.append(self.path)
+            failing = 0 < Handler.failures.get(self.path, 0)
+            if failing:
+                Handler.failures[self.path] -= 1
+        body = self.path.encode()
+        self.send_response(503 if failing else 200)
+        if failing:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *arguments):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.failures = {}
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_responses_keep_the_request_order(server):
+    executor = RequestExecutor(workers=4)
+    responses = executor.map([('GET', server + '/' + str(i), {}) for i in range(20)])
+    assert [response.text for response in responses] == ['/' + str(i) for i in range(20)]
+
+
+def test_unavailable_responses_are_retried(server):
+    Handler.failures = {'/flaky': 2, '/down': 10}
+    executor = RequestExecutor(workers=2, retries=3, backoff=0)
+    assert 200 == executor.send('GET', server + '/flaky').status_code
+    assert 3 == Handler.requests.count('/flaky')
+    assert 503 == executor.send('GET', server + '/down').status_code
+    assert 4 == Handler.requests.count('/down')
+
+
+def test_connection_failures_are_retried_then_raised():
+    executor = RequestExecutor(retries=1, backoff=0)
+    with pytest.raises(requests.ConnectionError):
+        executor.send('GET', 'http://127.0.0.1:9/', timeout=1)
+
+
+def test_retry():
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError()
+        return len(attempts)
+
+    assert 3 == retry(call, retries=3, backoff=0)
+    attempts.clear()
+    with pytest.raises(ValueError):
+        retry(call, retries=1, backoff=0)
+
+
+def test_retry_after():
+    response = requests.Response()
+    assert retry_after(response) is None
+    response.headers['Retry-After'] = '2.5'
+    assert 2.5 == retry_after(response)
+    response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    assert 0 == retry_after(response)
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = RateLimiter(20)
+    start = time.monotonic()
+    for i in range(3):
+        limiter.wait('http://a/' + str(i))
+    limiter.wait('http://b/')
+    assert 0.1 <= time.monotonic() - start < 0.15